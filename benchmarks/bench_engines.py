@@ -0,0 +1,230 @@
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from engines import ENGINES, RECTANGULAR, make_engine  # noqa: E402
+from munkres_numpy import np  # noqa: E402
+from stats import SolveStats  # noqa: E402
+
+SIZES = [10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+# largest n each engine is run at by default, the step machines are O(n^4)
+MAX_SIZE = {'munkres': 200,
+            'numpy': 1000,
+            'lapjv': 5000,
+            'auction': 1000,
+            'threaded': 5000}
+
+
+def uniform(n, rng):
+    return [[rng.randint(0, 1000) for _ in range(n)] for _ in range(n)]
+
+
+def ties(n, rng):
+    # few distinct values, lots of equal reduced costs
+    return [[rng.randint(0, 4) for _ in range(n)] for _ in range(n)]
+
+
+def rectangular(n, rng):
+    # n rows for 2n columns, padded to a square for the engines that need it
+    return [[rng.randint(0, 1000) for _ in range(2 * n)] for _ in range(n)]
+
+
+def geometric(n, rng):
+    workers = [(rng.random(), rng.random()) for _ in range(n)]
+    jobs = [(rng.random(), rng.random()) for _ in range(n)]
+    return [[int(round(1000 * math.hypot(x0 - x1, y0 - y1))) for x1, y1 in jobs] for x0, y0 in workers]
+
+
+def adversarial(n, rng):
+    # c[i][j] = i * j forces Munkres through about n cover updates per
+    # augmentation
+    return [[i * j for j in range(n)] for i in range(n)]
+
+
+DISTRIBUTIONS = {'uniform': uniform,
+                 'ties': ties,
+                 'rectangular': rectangular,
+                 'geometric': geometric,
+                 'adversarial': adversarial}
+
+
+def _square(matrix):
+    size = max(len(matrix), len(matrix[0]))
+    padded = [row + [0] * (size - len(row)) for row in matrix]
+    padded += [[0] * size for _ in range(size - len(matrix))]
+    return padded
+
+
+def _prepare(engine, matrix):
+    # the step machines need a square matrix, NumpyMunkres an ndarray
+    if engine in RECTANGULAR:
+        costs = matrix
+    else:
+        costs = _square(matrix)
+    if engine == 'numpy':
+        return np.array(costs)
+    return costs
+
+
+def _total(matrix, marked):
+    return sum(matrix[i][j] for i, j in marked if i < len(matrix) and j < len(matrix[i]))
+
+
+def _timed_run(engine, matrix):
+    solver = make_engine(engine)
+    costs = _prepare(engine, matrix)
+    start = time.perf_counter()
+    solver.setup(costs)
+    solver.solve_all()
+    elapsed = time.perf_counter() - start
+    if hasattr(solver, 'close'):
+        solver.close()
+    return elapsed, _total(matrix, solver.get_marked())
+
+
+def _traced_run(engine, matrix):
+    # peak python/numpy allocations, and what the step machine did for the
+    # engines that expose solve_step (scans, zero index lookups and
+    # augmentations where the engine takes a stats hook)
+    solver = make_engine(engine)
+    costs = _prepare(engine, matrix)
+    steps = None
+    hook = SolveStats() if hasattr(solver, 'set_hook') else None
+    if hook is not None:
+        solver.set_hook(hook)
+    tracemalloc.start()
+    try:
+        solver.setup(costs)
+        if hasattr(solver, 'solve_step'):
+            steps = {}
+            step = 1
+            while step is not None and step != 7:
+                steps[str(step)] = steps.get(str(step), 0) + 1
+                step = solver.solve_step(step)
+        else:
+            solver.solve_all()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    if hook is not None:
+        stats = hook.as_dict()
+        return peak, stats['steps'], stats['scans'], stats['lookups'], stats['augmentations']
+    return peak, steps, None, None, None
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(engines, distributions, sizes, seed, repeat, memory, max_size):
+    results = []
+    for name in distributions:
+        for n in sizes:
+            matrix = DISTRIBUTIONS[name](n, random.Random('%s-%d-%d' % (name, n, seed)))
+            for engine in engines:
+                if n > max_size.get(engine, max(sizes)):
+                    continue
+
+                times = []
+                total_cost = None
+                for _ in range(repeat):
+                    elapsed, total_cost = _timed_run(engine, matrix)
+                    times += [elapsed]
+
+                record = {'engine': engine,
+                          'distribution': name,
+                          'n': n,
+                          'seed': seed,
+                          'seconds': min(times),
+                          'total_cost': total_cost}
+                if memory:
+                    (record['peak_bytes'], record['steps'],
+                     record['scans'], record['lookups'], record['augmentations']) = _traced_run(engine, matrix)
+
+                print("%-10s %-12s n=%-5d %10.4fs  cost %s" % (engine, name, n, record['seconds'], total_cost),
+                      flush=True)
+                results += [record]
+
+    return results
+
+
+def compare(results, baseline, threshold, min_seconds):
+    # returns the cases that got slower than threshold times the baseline,
+    # cases faster than min_seconds in both runs are timer noise
+    previous = {(r['engine'], r['distribution'], r['n'], r['seed']): r for r in baseline['results']}
+    regressions = []
+    for record in results:
+        old = previous.get((record['engine'], record['distribution'], record['n'], record['seed']))
+        if old is None:
+            continue
+        ratio = record['seconds'] / old['seconds'] if old['seconds'] else math.inf
+        if old['total_cost'] != record['total_cost']:
+            print("%s %s n=%d: total cost changed from %s to %s" % (record['engine'], record['distribution'],
+                                                                   record['n'], old['total_cost'],
+                                                                   record['total_cost']))
+            regressions += [record]
+        elif ratio > threshold and max(record['seconds'], old['seconds']) >= min_seconds:
+            print("%s %s n=%d: %.2fx slower" % (record['engine'], record['distribution'], record['n'], ratio))
+            regressions += [record]
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="reproducible benchmarks of the solver engines")
+    parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES), default=sorted(ENGINES))
+    parser.add_argument('--distributions', nargs='+', choices=sorted(DISTRIBUTIONS), default=sorted(DISTRIBUTIONS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES)
+    parser.add_argument('--max-size', nargs='+', default=[], metavar='ENGINE=N',
+                        help="largest n for an engine, defaults: %s"
+                             % ', '.join('%s=%d' % item for item in sorted(MAX_SIZE.items())))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1, help="runs per case, the fastest is kept")
+    parser.add_argument('--no-memory', dest='memory', action='store_false',
+                        help="skip the traced run for peak memory and step counts")
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', metavar='BASELINE', help="results file of an earlier run")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="slowdown ratio reported as a regression (default 1.25)")
+    parser.add_argument('--min-seconds', type=float, default=0.01,
+                        help="cases faster than this are not compared (default 0.01)")
+    args = parser.parse_args(argv)
+
+    max_size = dict(MAX_SIZE)
+    for item in args.max_size:
+        engine, _, n = item.partition('=')
+        max_size[engine] = int(n)
+
+    engines = [engine for engine in args.engines if engine not in ('numpy', 'threaded') or np is not None]
+    results = run(engines, args.distributions, sorted(args.sizes), args.seed, args.repeat, args.memory, max_size)
+
+    with open(args.output, 'w') as out:
+        json.dump({'commit': _commit(),
+                   'python': platform.python_version(),
+                   'numpy': np.__version__ if np is not None else None,
+                   'machine': platform.machine(),
+                   'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                   'results': results}, out, indent=1)
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            if compare(results, json.load(baseline), args.threshold, args.min_seconds):
+                return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
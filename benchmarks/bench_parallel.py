@@ -0,0 +1,41 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import numpy as np  # noqa: E402
+
+from parallel import ParallelSolver  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="scaling of parallel batch solving from 1 to N workers")
+    parser.add_argument('--count', type=int, default=2000, help="number of matrices")
+    parser.add_argument('--size', type=int, default=20, help="size of every matrix")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="largest worker count")
+    parser.add_argument('--chunksize', type=int, default=64)
+    parser.add_argument('--engine', default='munkres')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    matrices = np.random.default_rng(args.seed).integers(0, 1000, (args.count, args.size, args.size))
+
+    counts = sorted({1, args.workers} | {2 ** k for k in range(args.workers.bit_length()) if 2 ** k <= args.workers})
+    baseline = None
+    print("workers  seconds  speedup")
+    for workers in counts:
+        with ParallelSolver(workers, args.chunksize, args.engine) as solver:
+            # warm the pool up so process start-up is not timed
+            solver.solve(matrices[:workers])
+            start = time.perf_counter()
+            solver.solve(matrices)
+            elapsed = time.perf_counter() - start
+
+        baseline = baseline or elapsed
+        print("%7d  %7.3f  %6.2fx" % (workers, elapsed, baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from munkres import Munkres  # noqa: E402
+from munkres_numpy import np  # noqa: E402
+from threaded import ThreadedLapJV  # noqa: E402
+
+THREADS = [1, 2, 4, 8, 16]
+
+# largest n the serial Munkres reference is computed for
+MUNKRES_SIZE = 200
+
+
+def _run(matrix, threads):
+    solver = ThreadedLapJV(threads)
+    start = time.perf_counter()
+    solver.setup(matrix)
+    solver.solve_all()
+    elapsed = time.perf_counter() - start
+    solver.close()
+    return elapsed, solver.get_assignment()
+
+
+def run(sizes, threads, seed, repeat):
+    # every thread count must give the assignment of one thread, and at the
+    # sizes Munkres can do, the same total cost as the serial Munkres
+    results = []
+    for n in sizes:
+        matrix = np.random.default_rng([seed, n]).integers(0, 1000000, size=(n, n))
+        reference = None
+        serial = None
+        for count in threads:
+            elapsed, assignment = min(_run(matrix, count) for _ in range(repeat))
+            total_cost = int(matrix[np.arange(n), assignment].sum())
+            if reference is None:
+                reference, serial = assignment, elapsed
+            elif assignment != reference:
+                raise AssertionError("n=%d: %d threads changed the assignment" % (n, count))
+            if count == threads[0] and n <= MUNKRES_SIZE:
+                munkres = Munkres()
+                munkres.setup(matrix.tolist())
+                munkres.solve_all()
+                expected = sum(int(matrix[i, j]) for i, j in munkres.get_marked())
+                if expected != total_cost:
+                    raise AssertionError("n=%d: total cost %d, Munkres %d" % (n, total_cost, expected))
+
+            print("n=%-6d threads=%-3d %10.3fs  speedup %5.2f  cost %d" % (n, count, elapsed, serial / elapsed,
+                                                                           total_cost), flush=True)
+            results += [{'n': n, 'threads': count, 'seconds': elapsed, 'speedup': serial / elapsed,
+                         'total_cost': total_cost}]
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="thread scaling of the threaded engine on one large solve")
+    parser.add_argument('--sizes', nargs='+', type=int, default=[200, 2000, 5000])
+    parser.add_argument('--threads', nargs='+', type=int, default=THREADS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1, help="runs per case, the fastest is kept")
+    parser.add_argument('--output', default='bench_threads.json')
+    args = parser.parse_args(argv)
+
+    if np is None:
+        print("the threaded engine needs numpy", file=sys.stderr)
+        return 1
+
+    results = run(args.sizes, args.threads, args.seed, args.repeat)
+    with open(args.output, 'w') as out:
+        json.dump({'python': platform.python_version(),
+                   'numpy': np.__version__,
+                   'machine': platform.machine(),
+                   'cores': os.cpu_count(),
+                   'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                   'results': results}, out, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
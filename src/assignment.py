@@ -0,0 +1,196 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+
+from cache import SolutionCache
+from decompose import solve_decomposed
+from engines import ENGINES
+from loader import integral, load_matrix, read_csv
+from solver import solve, solve_within
+from sparse import InfeasibleError
+from stats import SolveStats
+
+
+def _load(path):
+    if path == '-':
+        return read_csv(sys.stdin, square=False)
+    return load_matrix(path, square=False)
+
+
+def _write(out, fmt, matrix, marked, total_cost, timing, lower_bound=None):
+    # an integer file with x cells loads as float64, its costs are reported
+    # as integers all the same
+    whole = integral(matrix)
+    if whole:
+        total_cost = int(total_cost)
+        if lower_bound is not None and float(lower_bound).is_integer():
+            lower_bound = int(lower_bound)
+    if fmt == 'json':
+        result = {'assignment': [[i, j] for i, j in marked],
+                  'total_cost': total_cost}
+        if lower_bound is not None:
+            result['lower_bound'] = lower_bound
+            result['gap'] = total_cost - lower_bound
+        if timing is not None:
+            result['timing'] = timing
+        json.dump(result, out)
+        out.write('\n')
+    else:
+        writer = csv.writer(out)
+        writer.writerow(['row', 'col', 'cost'])
+        for i, j in marked:
+            writer.writerow([i, j, int(matrix[i][j]) if whole else matrix[i][j]])
+        writer.writerow(['total', '', total_cost])
+        if lower_bound is not None:
+            writer.writerow(['lower_bound', '', lower_bound])
+
+
+def command_solve(args):
+    fmt = args.format
+    if fmt is None:
+        fmt = 'csv' if os.path.splitext(args.out)[1].lower() == '.csv' else 'json'
+
+    start = time.perf_counter()
+    try:
+        matrix = _load(args.input)
+    except ValueError as e:
+        print("invalid matrix: %s" % e, file=sys.stderr)
+        return 1
+    loaded = time.perf_counter()
+    cache = None
+    stats = SolveStats() if args.stats is not None else None
+    lower_bound = None
+    try:
+        if args.budget is not None or args.epsilon is not None:
+            # an anytime solve is never cached, a bigger budget may do better
+            marked, total_cost, lower_bound = solve_within(matrix, args.budget, args.epsilon)
+        elif args.decompose or args.limit is not None:
+            marked, total_cost = solve_decomposed(matrix, args.engine, args.workers, limit=args.limit)
+        elif args.cache is not None:
+            cache = SolutionCache(directory=args.cache)
+            marked, total_cost = cache.solve(matrix, args.engine)
+        else:
+            marked, total_cost = solve(matrix, args.engine, hook=stats, threads=args.threads)
+    except InfeasibleError as e:
+        print("infeasible: %s" % e, file=sys.stderr)
+        return 2
+    except ValueError as e:
+        print("invalid matrix: %s" % e, file=sys.stderr)
+        return 1
+    solved = time.perf_counter()
+
+    if stats is not None:
+        if not stats.steps:
+            print("engine %s has no step instrumentation (or the result came from the cache)" % args.engine,
+                  file=sys.stderr)
+        elif args.stats == '-':
+            print(stats.summary(), file=sys.stderr)
+        else:
+            stats.save(args.stats)
+
+    timing = None
+    if args.timing:
+        engine = args.engine if lower_bound is None else 'auction'
+        timing = {'engine': engine,
+                  'load': loaded - start,
+                  'solve': solved - loaded}
+        print("engine %s: load %.6fs, solve %.6fs" % (engine, timing['load'], timing['solve']),
+              file=sys.stderr)
+        if cache is not None:
+            timing['cache'] = cache.stats()
+            print("cache: %(hits)d hits, %(misses)d misses" % timing['cache'], file=sys.stderr)
+
+    if args.out == '-':
+        _write(sys.stdout, fmt, matrix, marked, total_cost, timing, lower_bound)
+    else:
+        with open(args.out, 'w', newline='') as out:
+            _write(out, fmt, matrix, marked, total_cost, timing, lower_bound)
+
+    return 0
+
+
+def command_serve(args):
+    # imported here so the solve command does not pay for asyncio's service
+    from service import SolveService
+
+    async def serve():
+        cache = SolutionCache(directory=args.cache) if args.cache is not None else None
+        async with SolveService(args.engine, args.batch_size, args.batch_delay, args.small_size, args.workers,
+                                args.max_pending, args.timeout, cache) as service:
+            server = await service.listen(args.socket, args.host, args.port)
+            where = args.socket or "%s:%d" % (args.host, args.port)
+            print("serving on %s" % where, file=sys.stderr)
+            async with server:
+                await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print("cannot listen: %s" % e, file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='assignment', description="headless assignment problem solver")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    solve_parser = commands.add_parser('solve', help="solve a cost matrix")
+    solve_parser.add_argument('input', help="CSV or .npy cost matrix, - reads CSV from stdin")
+    solve_parser.add_argument('--out', default='-', help="result file, - writes to stdout (default)")
+    solve_parser.add_argument('--format', choices=('json', 'csv'),
+                              help="result format, guessed from --out (json by default)")
+    solve_parser.add_argument('--engine', choices=sorted(ENGINES), default='lapjv')
+    solve_parser.add_argument('--cache', metavar='DIR',
+                              help="reuse solutions stored in DIR and store new ones there")
+    solve_parser.add_argument('--stats', metavar='FILE',
+                              help="count and time the solver steps, - prints a summary to stderr, "
+                                   "a file name gets them as JSON (munkres engine)")
+    solve_parser.add_argument('--decompose', action='store_true',
+                              help="solve the independent blocks of the allowed pairs one by one, big blocks "
+                                   "in parallel")
+    solve_parser.add_argument('--limit', type=float, metavar='COST',
+                              help="with --decompose, pairs costing COST or more are forbidden")
+    solve_parser.add_argument('--workers', type=int,
+                              help="worker processes for --decompose, 0 solves every block in this process")
+    solve_parser.add_argument('--threads', type=int,
+                              help="threads of the threaded engine within one solve (default: one per core)")
+    solve_parser.add_argument('--budget', type=float, metavar='SECONDS',
+                              help="return the best assignment the auction engine finds in SECONDS, with a "
+                                   "lower bound on the optimum (lower_bound and gap in the result)")
+    solve_parser.add_argument('--epsilon', type=float,
+                              help="stop the auction engine once its bid increment is down to EPSILON, the "
+                                   "result is then within n * EPSILON of the optimum")
+    solve_parser.add_argument('--timing', action='store_true', help="report load and solve times")
+    solve_parser.set_defaults(func=command_solve)
+
+    serve_parser = commands.add_parser('serve', help="answer JSON solve requests, one per line")
+    serve_parser.add_argument('--socket', metavar='PATH', help="listen on a unix socket instead of TCP")
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--engine', choices=sorted(ENGINES), default='lapjv',
+                              help="engine for requests that do not name one")
+    serve_parser.add_argument('--batch-size', type=int, default=32, help="most problems solved together")
+    serve_parser.add_argument('--batch-delay', type=float, default=0.002,
+                              help="seconds a small problem waits for others of its shape")
+    serve_parser.add_argument('--small-size', type=int, default=64,
+                              help="problems this large or larger go to the worker pool")
+    serve_parser.add_argument('--workers', type=int, help="worker processes, 0 solves on a thread")
+    serve_parser.add_argument('--max-pending', type=int, default=1024,
+                              help="requests in flight before new ones are rejected")
+    serve_parser.add_argument('--timeout', type=float, default=30.0, help="default seconds per request")
+    serve_parser.add_argument('--cache', metavar='DIR', help="answer repeated matrices from DIR")
+    serve_parser.set_defaults(func=command_serve)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,282 @@
+import math
+import time
+from operator import add
+
+from costs import FORBIDDEN, INT64, OBJECT, REL_EPSILON, cost_kind, has_forbidden, working_rows
+from sparse import check_feasible, hopcroft_karp
+
+# every price update shrinks epsilon by this factor
+SCALING = 8
+
+# the clock is read once per this many bids
+CLOCK_EVERY = 64
+
+# epsilon never goes below this many ulps of the largest cost + price, a
+# smaller bid would not move a float64 price
+ULPS = 8
+
+
+class Auction:
+    # anytime solver: a forward auction with epsilon scaling. Every row bids
+    # for the column with the lowest cost + price and raises that price by its
+    # margin over the second best plus epsilon. A feasible assignment is kept
+    # at all times (a greedy one to begin with, then the best phase result)
+    # together with the lower bound the current prices prove,
+    #   sum_i min_j (c[i][j] + p[j]) - sum_j p[j],
+    # so a time budgeted solve knows how far from the optimum it may be.
+    # Prices are float64: integer costs are solved exactly as long as the
+    # round-off of costs + prices stays far below 1/n (setup raises
+    # ValueError otherwise), float costs to a relative gap of REL_EPSILON
+
+    def __init__(self, seconds=None, epsilon=None):
+        self.__seconds = seconds
+        self.__epsilon = epsilon
+        self.__start = None
+        self.__C = None
+        self.__n = 0
+        self.__n_real = 0
+        self.__transposed = False
+        self.__integral = True
+        self.__forbidden = False
+        self.__span = 0
+        self.__floor = 0.0
+        self.__prices = []
+        self.__best = None
+        self.__best_cost = math.inf
+        self.__bound = -math.inf
+        self.__phases = 0
+        self.__timed_out = False
+        self.__progress = None
+        self.__cancelled = False
+
+    def set_progress(self, callback):
+        # callback(matched, n) every CLOCK_EVERY bids (rows holding a column
+        # in the current phase) and after every phase. Returning False stops
+        # solve_all like a spent budget: the best assignment found so far, or
+        # the partial phase completed greedily, is kept
+        self.__progress = callback
+
+    def is_cancelled(self):
+        return self.__cancelled
+
+    def set_budget(self, seconds=None, epsilon=None):
+        # solve_all stops after about `seconds` counted from setup(), or once
+        # epsilon is down to `epsilon` (the assignment is then within
+        # n * epsilon of the optimum), whichever comes first. None for both
+        # solves exactly. Whatever the budget, one greedy pass over the matrix
+        # is always made so there is an assignment to return
+        self.__seconds = seconds
+        self.__epsilon = epsilon
+
+    def setup(self, cost_matrix):
+        # works on a square copy: a tall matrix is transposed, a wide one gets
+        # zero-cost dummy rows that never show up in the result
+        self.__start = time.perf_counter()
+        kind = cost_kind(cost_matrix)
+        if kind == OBJECT:
+            raise ValueError("the auction engine bids in float64 and needs int64 or float64 costs, "
+                             "use the lapjv engine for these")
+        C = working_rows(cost_matrix, kind)
+        self.__transposed = len(C) > len(C[0])
+        if self.__transposed:
+            C = [list(col) for col in zip(*C)]
+        self.__n_real = len(C)
+        n = self.__n = len(C[0])
+        self.__C = C + [[0] * n for _ in range(n - self.__n_real)]
+        self.__integral = kind == INT64
+        self.__forbidden = has_forbidden(C)
+
+        if self.__forbidden:
+            finite = [value for row in self.__C for value in row if value != FORBIDDEN]
+            low, high = min(finite), max(finite)
+        else:
+            low, high = min(map(min, self.__C)), max(map(max, self.__C))
+        self.__span = high - low
+        # prices stay below (n + 1) * span, so that bounds every cost + price
+        self.__floor = ULPS * math.ulp(max(abs(low), abs(high)) + (n + 1) * self.__span)
+        if self.__integral and 2 * n * self.__floor >= 1:
+            raise ValueError("integer costs this large cannot be solved exactly with float64 prices, "
+                             "use the lapjv engine")
+
+        self.__prices = []
+        self.__best = None
+        self.__best_cost = math.inf
+        self.__bound = -math.inf
+        self.__phases = 0
+        self.__timed_out = False
+
+    def get_marked(self):
+        if self.__best is None:
+            return []
+        if self.__transposed:
+            return sorted((j, i) for i, j in enumerate(self.__best[:self.__n_real]))
+        return list(enumerate(self.__best[:self.__n_real]))
+
+    def get_cost(self):
+        return self.__best_cost
+
+    def get_lower_bound(self):
+        return self.__bound
+
+    def get_gap(self):
+        # how much more than the optimum the assignment may cost
+        return max(self.__best_cost - self.__bound, 0)
+
+    def is_optimal(self):
+        # the bound of an integer problem is rounded up to an integer, a
+        # float one is optimal to a relative REL_EPSILON
+        if self.__integral:
+            return self.get_gap() == 0
+        return self.get_gap() <= REL_EPSILON * max(1.0, abs(self.__best_cost))
+
+    def is_timed_out(self):
+        return self.__timed_out
+
+    def get_prices(self):
+        return self.__prices
+
+    def get_phases(self):
+        return self.__phases
+
+    def solve_all(self):
+        start = time.perf_counter()
+        if self.__start is None:
+            self.__start = start
+        deadline = self.__start + self.__seconds if self.__seconds is not None else None
+        self.__start = None
+        if self.__forbidden:
+            check_feasible(self.__C)
+
+        n, span = self.__n, self.__span
+        # a greedy assignment and the bound of zero prices (the sum of the row
+        # minimums) stand until the first phase does better
+        passes = time.perf_counter()
+        self.__prices = [0] * n
+        self.__offer(self.__greedy() or self.__any_matching())
+        self.__raise_bound()
+        self.__timed_out = False
+        self.__cancelled = False
+        if span == 0 or self.is_optimal():
+            return
+        if deadline is not None:
+            # the same two passes close the bidding: a greedy completion when
+            # time runs out in a phase, a bound pass when a phase completes,
+            # their time is kept back from the budget
+            deadline -= time.perf_counter() - passes
+            if time.perf_counter() > deadline:
+                self.__timed_out = True
+                return
+
+        # with epsilon < 1/n an integer problem is solved exactly (1/2n leaves
+        # room for the round-off setup checked), a float one runs until its
+        # relative gap closes or epsilon cannot get any smaller
+        final = 1 / (2 * n) if self.__integral else self.__floor
+        if self.__epsilon is not None:
+            final = max(final, self.__epsilon)
+        prices = self.__prices = [0.0] * n
+        epsilon = max(span / SCALING, final)
+
+        while True:
+            col4row, complete = self.__bid(prices, epsilon, span, deadline)
+            if not complete:
+                # out of time (or cancelled) halfway through a phase: the rows
+                # still bidding are matched greedily, that may still beat the
+                # incumbent
+                self.__timed_out = not self.__cancelled
+                self.__offer(self.__greedy(col4row))
+                return
+            self.__phases += 1
+            self.__offer(col4row)
+            self.__raise_bound()
+            if self.is_optimal() or epsilon <= final:
+                return
+            if self.__progress is not None and self.__progress(n, n) is False:
+                self.__cancelled = True
+                return
+            if deadline is not None and time.perf_counter() > deadline:
+                self.__timed_out = True
+                return
+            epsilon = max(epsilon / SCALING, final)
+
+    def __bid(self, prices, epsilon, span, deadline):
+        # one Gauss-Seidel auction phase from an empty assignment, returns the
+        # assignment and whether it completed before the deadline
+        C, n = self.__C, self.__n
+        col4row = [-1] * n
+        row4col = [-1] * n
+        free = list(range(n - 1, -1, -1))
+        bids = 0
+        while free:
+            i = free.pop()
+            values = list(map(add, C[i], prices))
+            best = min(values)
+            j = values.index(best)
+            values[j] = math.inf
+            second = min(values)
+            # a row with one allowed column still has to bid a finite amount
+            prices[j] += (second - best if second != math.inf else span) + epsilon
+
+            owner = row4col[j]
+            if owner >= 0:
+                col4row[owner] = -1
+                free.append(owner)
+            row4col[j] = i
+            col4row[i] = j
+
+            bids += 1
+            if bids % CLOCK_EVERY == 0:
+                if deadline is not None and time.perf_counter() > deadline:
+                    return col4row, False
+                if self.__progress is not None and self.__progress(n - len(free), n) is False:
+                    self.__cancelled = True
+                    return col4row, False
+        return col4row, True
+
+    def __greedy(self, col4row=None):
+        # every unmatched row takes its cheapest free column, None when some
+        # row is left with forbidden pairs only
+        C, n = self.__C, self.__n
+        col4row = [-1] * n if col4row is None else col4row[:]
+        taken = set(col4row)
+        free_cols = [j for j in range(n) if j not in taken]
+        for i in range(n):
+            if col4row[i] >= 0:
+                continue
+            values = list(map(C[i].__getitem__, free_cols))
+            best = min(values)
+            if best == FORBIDDEN:
+                return None
+            k = values.index(best)
+            col4row[i] = free_cols[k]
+            free_cols[k] = free_cols[-1]
+            free_cols.pop()
+        return col4row
+
+    def __any_matching(self):
+        C = self.__C
+        return hopcroft_karp([[j for j, value in enumerate(row) if value != FORBIDDEN] for row in C], self.__n)
+
+    def __offer(self, col4row):
+        if col4row is None:
+            return
+        C = self.__C
+        cost = sum(C[i][col4row[i]] for i in range(self.__n_real))
+        if cost < self.__best_cost:
+            self.__best_cost = cost
+            self.__best = col4row
+
+    def __raise_bound(self):
+        # weak duality holds for any prices, the best bound seen is kept
+        prices = self.__prices
+        if any(prices):
+            bound = sum(min(map(add, row, prices)) for row in self.__C) - sum(prices)
+        else:
+            bound = sum(map(min, self.__C))
+        if self.__integral:
+            # the optimum is an integer; setup made sure the round-off stays
+            # below a quarter, so the rounded bound never passes it
+            bound = math.ceil(bound - 0.25)
+        self.__bound = max(self.__bound, bound)
+        # round-off can put a float bound a hair above the incumbent
+        if self.__bound > self.__best_cost:
+            self.__bound = self.__best_cost
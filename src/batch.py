@@ -0,0 +1,34 @@
+from array import array
+
+from lapjv import LapJV
+from munkres_numpy import np
+
+
+def solve_batch(matrices):
+    # solves many independent problems with one LapJV; returns the column
+    # assigned to each row (-1 for the rows of a tall matrix that get none)
+    # and the total cost of every problem. A stacked (k, n, m) ndarray is
+    # converted to lists in one call and gets a (k, n) assignment array and
+    # an array of k costs back
+    stacked = np is not None and isinstance(matrices, np.ndarray)
+    if stacked:
+        if matrices.ndim != 3:
+            raise ValueError("expected a stack of matrices, got shape %s" % (matrices.shape,))
+        problems = matrices.tolist()
+    else:
+        problems = matrices
+
+    engine = LapJV()
+    assignments = []
+    costs = []
+    for matrix in problems:
+        engine.setup(matrix)
+        engine.solve_all()
+
+        cols = engine.get_assignment()
+        assignments += [array('l', cols)]
+        costs += [sum(matrix[i][cols[i]] for i in range(len(matrix)) if cols[i] >= 0)]
+
+    if stacked:
+        return np.array(assignments, dtype=np.intp).reshape(matrices.shape[:2]), np.array(costs)
+    return assignments, costs
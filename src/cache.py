@@ -0,0 +1,191 @@
+import collections
+import hashlib
+import json
+import logging
+import os
+from array import array
+
+from solver import solve
+
+
+def fingerprint(matrix, *extra):
+    # blake2b over the shape and the raw cell values. Typed rows and ndarrays
+    # hash their buffers directly, python rows are packed to int64 (float64
+    # when every cell is a float) and anything else hashes its repr. extra
+    # values (engine, pad value...) become part of the key
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(extra).encode())
+
+    if hasattr(matrix, 'dtype'):
+        digest.update(repr((matrix.shape, matrix.dtype.str)).encode())
+        digest.update(matrix.tobytes())
+        return digest.hexdigest()
+
+    digest.update(repr(len(matrix)).encode())
+    for row in matrix:
+        if isinstance(row, array):
+            data = row.typecode.encode() + row.tobytes()
+        else:
+            try:
+                data = b'q' + array('q', row).tobytes()
+            except (TypeError, OverflowError):
+                if all(type(value) is float for value in row):
+                    data = b'd' + array('d', row).tobytes()
+                else:
+                    data = b'r' + repr(list(row)).encode()
+        digest.update(repr(len(data)).encode())
+        digest.update(data)
+
+    return digest.hexdigest()
+
+
+class SolutionCache:
+    # memoizes (assignment, total_cost) by matrix fingerprint. The memory side
+    # is an LRU bounded by entries and by stored pairs, the optional directory
+    # keeps one JSON file per solution so results survive restarts. It holds
+    # at most max_files solutions, the least recently used (by mtime, a disk
+    # hit touches its file) are deleted first
+
+    def __init__(self, max_entries=256, max_pairs=1 << 20, directory=None, max_files=4096):
+        self.__max_entries = max_entries
+        self.__max_pairs = max_pairs
+        self.__directory = directory
+        self.__max_files = max_files
+        self.__entries = collections.OrderedDict()
+        self.__pairs = 0
+        self.__files = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self.__files = len(self.__stored())
+            if self.__files > max_files:
+                self.__evict()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, key):
+        return key in self.__entries or (self.__directory is not None and
+                                         os.path.exists(self.__path(key)))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self.__entries),
+                'pairs': self.__pairs}
+
+    def get(self, key):
+        entry = self.__entries.get(key)
+        if entry is not None:
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        entry = self.__read(key)
+        if entry is not None:
+            self.__remember(key, entry)
+            self.hits += 1
+            self.disk_hits += 1
+            return entry
+
+        self.misses += 1
+        return None
+
+    def put(self, key, marked, total_cost):
+        if hasattr(total_cost, 'item'):
+            total_cost = total_cost.item()
+        entry = ([tuple(pair) for pair in marked], total_cost)
+        self.__remember(key, entry)
+        self.__write(key, entry)
+
+    def solve(self, matrix, engine='lapjv', pad_value=0):
+        # solver.solve with memoization, the cached assignment is a fresh list
+        key = fingerprint(matrix, engine, pad_value)
+        entry = self.get(key)
+        if entry is None:
+            entry = solve(matrix, engine, pad_value)
+            self.put(key, *entry)
+        marked, total_cost = entry
+        return list(marked), total_cost
+
+    def clear(self):
+        self.__entries.clear()
+        self.__pairs = 0
+
+    def __remember(self, key, entry):
+        old = self.__entries.pop(key, None)
+        if old is not None:
+            self.__pairs -= len(old[0])
+        if len(entry[0]) > self.__max_pairs:
+            return
+
+        self.__entries[key] = entry
+        self.__pairs += len(entry[0])
+        while len(self.__entries) > self.__max_entries or self.__pairs > self.__max_pairs:
+            _, (marked, _) = self.__entries.popitem(last=False)
+            self.__pairs -= len(marked)
+
+    def __path(self, key):
+        return os.path.join(self.__directory, key + '.json')
+
+    def __read(self, key):
+        if self.__directory is None:
+            return None
+        try:
+            with open(self.__path(key)) as cached:
+                data = json.load(cached)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning("ignoring the cached solution %s: %s", key, e)
+            return None
+        try:
+            os.utime(self.__path(key))
+        except OSError:
+            pass
+        return [tuple(pair) for pair in data['assignment']], data['total_cost']
+
+    def __write(self, key, entry):
+        if self.__directory is None:
+            return
+        path = self.__path(key)
+        new = not os.path.exists(path)
+        try:
+            # written aside and renamed so a reader never sees half a file
+            with open(path + '.tmp', 'w') as out:
+                json.dump({'assignment': entry[0], 'total_cost': entry[1]}, out)
+            os.replace(path + '.tmp', path)
+        except (OSError, TypeError, ValueError) as e:
+            logging.warning("could not store the solution %s: %s", key, e)
+            try:
+                os.unlink(path + '.tmp')
+            except OSError:
+                pass
+            return
+
+        if new:
+            self.__files += 1
+            if self.__files > self.__max_files:
+                self.__evict()
+
+    def __stored(self):
+        with os.scandir(self.__directory) as entries:
+            return [entry for entry in entries if entry.name.endswith('.json') and entry.is_file()]
+
+    def __evict(self):
+        # down to three quarters of max_files, so the directory is not listed
+        # again on every write
+        stored = sorted(self.__stored(), key=lambda entry: entry.stat().st_mtime)
+        keep = self.__max_files * 3 // 4
+        for entry in stored[:max(0, len(stored) - keep)]:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
+        self.__files = min(len(stored), keep)
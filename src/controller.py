@@ -1,133 +1,314 @@
 import tkinter as tk  # python 3
-import copy
-import csv
+import logging
+import os
+import queue
+import threading
 
 from munkres import Munkres
+from lapjv import LapJV
+from cache import SolutionCache, fingerprint
+from costs import has_forbidden, parse_cost
+from sparse import InfeasibleError, check_feasible
+from loader import load_matrix, save_matrix, whole_lists
+from steptrace import StepTrace, TracePlayer
+from stats import SolveStats
 from interface import Interface
 
+POLL_INTERVAL = 50  # milliseconds between two looks at the solver thread
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'assignment-problem')
+
 
 class Controller:
     def __init__(self):
         self.__root = tk.Tk()
         self.__munkres = Munkres()
+        self.__lapjv = LapJV()
+        self.__solver = self.__munkres
+        self.__cache = self.__make_cache()
         self.__ui = Interface(self.__root, self)
 
         self.__size = 0
-        self.__origin_matrix = []
+        # the one copy of the costs, the solvers only read it (LapJV.set_cell
+        # writes the edited cell into it)
         self.__cost_matrix = []
         self.__step = 1
+        self.__warm = False
+        self.__trace = None
+        self.__player = None
+        self.__stats = None
+
+        self.__solve_thread = None
+        self.__cancel = None
+        self.__messages = None
+
+    @staticmethod
+    def __make_cache():
+        # reopened projects and unchanged re-solves come from the cache, it
+        # stays in memory when the cache directory cannot be created
+        try:
+            return SolutionCache(directory=CACHE_DIR)
+        except OSError as e:
+            logging.warning("solution cache kept in memory only: %s", e)
+            return SolutionCache()
 
     @staticmethod
     def init_cost_matrix(size, value=None):
         return [[value for _ in range(size)] for _ in range(size)]
 
     def set_cost_matrix(self, row, col, value):
-        self.__cost_matrix[row][col] = self.__origin_matrix[row][col] = int(value)
+        if self.is_solving():
+            return
+        # ints, floats (inf for a pair that should never be chosen) and
+        # integers of any size are kept as they are, text is parsed
+        self.__cost_matrix[row][col] = parse_cost(value) if isinstance(value, str) else value
+        self.__reset_trace()
+        if self.__warm:
+            self.__lapjv.set_cell(row, col, self.__cost_matrix[row][col])
 
     def get_cost_matrix(self, row, col):
+        # while a trace is replayed the reduced costs of its current step show
+        if self.__player is not None:
+            return self.__player.value(row, col)
         return self.__cost_matrix[row][col]
 
     def get_total_cost(self):
         total_cost = 0
-        for row, col in self.__munkres.get_marked():
-            total_cost += self.__origin_matrix[row][col]
+        for row, col in self.__solver.get_marked():
+            total_cost += self.__cost_matrix[row][col]
         return total_cost
 
+    def is_feasible(self):
+        # forbidden (x) cells can leave some row without a partner, that is
+        # reported before any solving starts
+        if not has_forbidden(self.__cost_matrix):
+            return True
+        try:
+            check_feasible(self.__cost_matrix)
+        except InfeasibleError as e:
+            self.__ui.showerror("infeasible", str(e))
+            return False
+        return True
+
+    def is_solving(self):
+        return self.__solve_thread is not None
+
     def is_fill_matrix(self):
         for i in range(self.__size):
             for j in range(self.__size):
-                if self.__origin_matrix[i][j] is None:
+                if self.__cost_matrix[i][j] is None:
                     return False
         return True
 
-    @staticmethod
-    def pad_matrix(matrix, pad_value=0):
-        max_columns = 0
-        total_rows = len(matrix)
-
-        for row in matrix:
-            max_columns = max(max_columns, len(row))
-
-        total_rows = max(max_columns, total_rows)
-
-        new_matrix = []
-        for row in matrix:
-            row_len = len(row)
-            new_row = row[:]
-            if total_rows > row_len:
-                # Row too short. Pad it.
-                new_row += [pad_value] * (total_rows - row_len)
-            new_matrix += [new_row]
-
-        while len(new_matrix) < total_rows:
-            new_matrix += [[pad_value] * total_rows]
-
-        return new_matrix
-
     def command_solve(self):
+        if self.is_solving():
+            return
         if self.is_fill_matrix():
-            self.__munkres.setup(self.__cost_matrix)
-            self.__munkres.solve_all()
+            if not self.is_feasible():
+                return
+            # the solve runs on a worker thread, Tk is only touched from the
+            # main loop which polls the worker's messages
+            self.__solver = self.__lapjv
+            self.__reset_trace()
+            if not self.__warm:
+                cached = self.__cache.get(fingerprint(self.__cost_matrix, 'lapjv'))
+                if cached is not None:
+                    self.__ui.matrix.draw_marked(cached[0])
+                    self.__ui.matrix.fill_matrix()
+                    self.__ui.matrix.draw_matrix_lines()
+                    self.__ui.toppanel.set_label(cached[1])
+                    return
+            self.__cancel = threading.Event()
+            self.__messages = queue.Queue()
+            self.__solve_thread = threading.Thread(target=self.__solve_worker,
+                                                   args=(self.__warm, self.__cancel, self.__messages),
+                                                   daemon=True)
+            self.__ui.toppanel.set_solving(True)
+            self.__solve_thread.start()
+            self.__root.after(POLL_INTERVAL, self.__poll_solve)
+        else:
+            self.__ui.showerror("error", "matrix is not filled correctly")
 
-            self.__ui.matrix.draw_marked(self.__munkres.get_marked())
+    def command_cancel(self):
+        if self.is_solving():
+            self.__cancel.set()
+
+    def __solve_worker(self, warm, cancel, messages):
+        def progress(matched, total):
+            messages.put(('progress', matched, total))
+            return not cancel.is_set()
+
+        self.__lapjv.set_progress(progress)
+        try:
+            if warm:
+                # only the cells edited since the last solve are repaired
+                self.__lapjv.resolve()
+            else:
+                self.__lapjv.setup(self.__cost_matrix)
+                self.__lapjv.solve_all()
+            messages.put(('cancelled',) if self.__lapjv.is_cancelled() else ('done', warm))
+        except Exception as e:
+            logging.exception(e)
+            messages.put(('error', str(e)))
+        finally:
+            self.__lapjv.set_progress(None)
+
+    def __poll_solve(self):
+        progress = None
+        result = None
+        try:
+            while result is None:
+                message = self.__messages.get_nowait()
+                if message[0] == 'progress':
+                    progress = message[1:]
+                else:
+                    result = message
+        except queue.Empty:
+            pass
+
+        if progress is not None:
+            self.__ui.toppanel.set_progress(*progress)
+        if result is None:
+            self.__root.after(POLL_INTERVAL, self.__poll_solve)
+            return
+
+        self.__solve_thread.join()
+        self.__solve_thread = self.__cancel = self.__messages = None
+        self.__ui.toppanel.set_solving(False)
+
+        if result[0] == 'done':
+            self.__warm = True
+            total_cost = self.get_total_cost()
+            # a warm resolve follows an edit, its matrix is rarely seen again
+            # and caching every edit would only fill the cache directory
+            if not result[1]:
+                self.__cache.put(fingerprint(self.__cost_matrix, 'lapjv'), self.__solver.get_marked(), total_cost)
+            self.__ui.matrix.draw_marked(self.__solver.get_marked())
             self.__ui.matrix.fill_matrix()
             self.__ui.matrix.draw_matrix_lines()
-            self.__ui.toppanel.set_label(self.get_total_cost())
+            self.__ui.toppanel.set_label(total_cost)
         else:
-            self.__ui.showerror("error", "matrix is not filled correctly")
+            self.__warm = False
+            self.__ui.toppanel.reset_label()
+            if result[0] == 'error':
+                self.__ui.showerror("error", "the solver failed: " + result[1])
 
     def command_step(self):
+        if self.is_solving():
+            return
         if self.is_fill_matrix():
-            if self.__step == 1:
+            if self.__player is None and not self.is_feasible():
+                return
+            self.__solver = self.__munkres
+            if self.__player is None:
+                # every step the step machine takes is recorded so the GUI can
+                # go back and forth by deltas
+                self.__trace = StepTrace()
+                self.__stats = SolveStats()
+                self.__munkres.set_trace(self.__trace)
+                self.__munkres.set_hook(self.__stats)
                 self.__munkres.setup(self.__cost_matrix)
+                self.__player = TracePlayer(self.__trace)
+                self.__step = 1
 
-            self.__step = self.__munkres.solve_step(self.__step)
+            if self.__player.at_end() and self.__step is not None and self.__step != 7:
+                self.__step = self.__munkres.solve_step(self.__step)
+            self.__player.forward()
+            self.__draw_trace()
 
-            self.__ui.matrix.draw_covered(self.__munkres.get_row_covered(), self.__munkres.get_col_covered())
-            self.__ui.matrix.draw_marked(self.__munkres.get_marked())
-            self.__ui.matrix.draw_matrix_lines()
-            self.__ui.matrix.fill_matrix()
+        else:
+            self.__ui.showerror("error", "matrix is not filled correctly")
 
-            if self.__step == 7:
-                self.__ui.toppanel.set_label(self.get_total_cost())
+    def command_step_back(self):
+        if self.is_solving() or self.__player is None:
+            return
+        if self.__player.backward():
+            self.__draw_trace()
+
+    def command_seek(self, position):
+        if self.is_solving() or self.__player is None or position == self.__player.position:
+            return
+        self.__player.seek(position)
+        self.__draw_trace()
+
+    def command_export_trace(self):
+        if self.__trace is None or not len(self.__trace):
+            self.__ui.showerror("error", "there is no step trace, use step first")
+            return
+        filepath = self.__ui.save_trace()
+        if filepath:
+            self.__trace.save(str(filepath))
 
+    def command_export_stats(self):
+        if self.__stats is None or not self.__stats.steps:
+            self.__ui.showerror("error", "there are no step statistics, use step first")
+            return
+        filepath = self.__ui.save_stats()
+        if filepath:
+            self.__stats.save(str(filepath))
+
+    def __draw_trace(self):
+        player = self.__player
+        self.__ui.matrix.draw_covered(player.get_row_covered(), player.get_col_covered())
+        self.__ui.matrix.draw_marked(player.get_marked())
+        self.__ui.matrix.draw_matrix_lines()
+        self.__ui.matrix.fill_matrix()
+        self.__ui.toppanel.set_trace_position(player.position, len(self.__trace))
+
+        if player.is_finished():
+            total_cost = sum(self.__cost_matrix[row][col] for row, col in player.get_marked())
+            self.__ui.toppanel.set_label(total_cost)
         else:
-            self.__ui.showerror("error", "matrix is not filled correctly")
+            self.__ui.toppanel.reset_label()
+
+    def __reset_trace(self):
+        self.__munkres.set_trace(None)
+        self.__munkres.set_hook(None)
+        self.__player = None
+        self.__step = 1
 
     def command_new_matrix(self, size):
+        if self.is_solving():
+            self.__ui.showerror("error", "cancel the running solve first")
+            return
         self.__size = size
-        self.__origin_matrix = self.init_cost_matrix(self.__size)
-        self.__cost_matrix = copy.deepcopy(self.__origin_matrix)
+        self.__cost_matrix = self.init_cost_matrix(self.__size)
 
+        self.__reset_trace()
+        self.__trace = None
         self.__ui.matrix.init_empty_matrix(self.__size)
         self.__ui.toppanel.reset_label()
+        self.__ui.toppanel.set_trace_position(0, 0)
 
-        self.__step = 1
+        self.__warm = False
 
     def command_open(self):
+        if self.is_solving():
+            self.__ui.showerror("error", "cancel the running solve first")
+            return
         filepath = self.__ui.open_project()
         if filepath:
-            with open(filepath, 'r') as csvfile:
-                csv_reader = csv.reader(csvfile, delimiter=',')
-
-                self.__origin_matrix = self.pad_matrix(
-                        [list(map(int, line)) for line in csv_reader])
-
-                self.__cost_matrix = copy.deepcopy(self.__origin_matrix)
-                self.__size = len(self.__origin_matrix)
-
-                self.__ui.matrix.init_empty_matrix(self.__size)
-                self.__ui.matrix.fill_matrix()
-                self.__ui.toppanel.reset_label()
-
-        self.__step = 1
+            # the loader pads while it reads into a typed buffer, the GUI
+            # edits python lists built from it in one pass (integer costs
+            # next to x cells come back as ints)
+            try:
+                self.__cost_matrix = whole_lists(load_matrix(filepath))
+            except ValueError as e:
+                self.__ui.showerror("error", "cannot open %s: %s" % (filepath, e))
+                return
+            self.__size = len(self.__cost_matrix)
+            self.__reset_trace()
+            self.__trace = None
+
+            self.__ui.matrix.init_empty_matrix(self.__size)
+            self.__ui.matrix.fill_matrix()
+            self.__ui.toppanel.reset_label()
+            self.__ui.toppanel.set_trace_position(0, 0)
+            self.__warm = False
 
     def command_save(self):
-        filepath = str(self.__ui.save_project())
+        filepath = self.__ui.save_project()
         if filepath:
-            with open(filepath, 'w') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerows(self.__origin_matrix)
+            save_matrix(str(filepath), self.__cost_matrix)
 
     def run(self):
         self.__root.title('assignment problem')
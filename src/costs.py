@@ -0,0 +1,141 @@
+import math
+from array import array
+
+# the three cost types the solvers store natively:
+#   int64    typed 'q' rows (numpy int64)
+#   float64  typed 'd' rows (numpy float64), math.inf marks a forbidden pair
+#   object   python lists (numpy object arrays) for integers beyond int64,
+#            fractions, decimals... exact unless floats are mixed in
+# the step engines test for exact zeros with every type: a reduction x - m
+# by the smallest m of the cells it touches is exactly 0 for that cell and
+# never negative for the others, float round-off included
+INT64 = 'int64'
+FLOAT64 = 'float64'
+OBJECT = 'object'
+
+TYPECODES = {INT64: 'q', FLOAT64: 'd'}
+
+# int64 storage is only used while every cost is below this, step 6 adds to
+# covered cells and must not overflow
+INT64_LIMIT = 2 ** 62
+
+# a pair that must never be chosen. The solvers skip it and check first that
+# a complete assignment exists without it (sparse.check_feasible). In CSV
+# files and the GUI it is written as x (or inf)
+FORBIDDEN = math.inf
+FORBIDDEN_TEXT = ('x', 'X')
+
+# relative gap at which the auction engine calls a float problem solved
+REL_EPSILON = 1e-9
+
+
+def parse_cost(text):
+    # '12' -> 12, '-3' -> -3, '2.5' / '1e3' / 'inf' -> float, 'x' -> FORBIDDEN,
+    # anything else ('nan' and '-inf' included) raises ValueError
+    text = text.strip()
+    if text in FORBIDDEN_TEXT:
+        return FORBIDDEN
+    try:
+        return int(text)
+    except ValueError:
+        return check_cost(float(text))
+
+
+def check_cost(value):
+    # NaN compares false with everything and -inf is below any path, the
+    # solvers would search forever on either
+    if value != value or value == -math.inf:
+        raise ValueError("%r is not a cost, use a finite number (or x / inf for a forbidden pair)" % (value,))
+    return value
+
+
+def _check_floats(values):
+    # check_cost over a row of floats, in C
+    if -math.inf in values or any(map(math.isnan, values)):
+        check_cost(next(value for value in values if value != value or value == -math.inf))
+
+
+def text_kind(text):
+    # the cost type a CSV cell needs, judged from its text without parsing it
+    digits = text.strip().lstrip('+-')
+    if digits.isdigit():
+        return INT64 if len(digits) <= 18 else OBJECT
+    return FLOAT64
+
+
+def widest(kinds):
+    kinds = set(kinds)
+    if OBJECT in kinds:
+        return OBJECT
+    if FLOAT64 in kinds:
+        return FLOAT64
+    return INT64
+
+
+def cost_kind(matrix):
+    # the cost type (see above) the matrix needs. Raises ValueError for NaN
+    # and -inf cells, so every engine calling it fails before solving
+    dtype = getattr(matrix, 'dtype', None)
+    if dtype is not None:
+        if dtype.kind in 'iub':
+            return INT64
+        if dtype.kind == 'f':
+            if (matrix != matrix).any() or (matrix == -math.inf).any():
+                _check_floats(matrix.ravel().tolist())
+            return FLOAT64
+        for value in matrix.flat:
+            check_cost(value)
+        return OBJECT
+
+    has_float = has_big = has_object = False
+    for row in matrix:
+        if isinstance(row, array):
+            if row.typecode in 'fd':
+                has_float = True
+                _check_floats(row)
+            continue
+        types = set(map(type, row))
+        if types <= {int, float}:
+            # plain python numbers, checked without a python level loop
+            if float in types:
+                has_float = True
+                _check_floats(row if int not in types else [value for value in row if type(value) is float])
+            if int in types and not has_big:
+                ints = row if float not in types else [value for value in row if type(value) is int]
+                has_big = not -INT64_LIMIT < min(ints) <= max(ints) < INT64_LIMIT
+            continue
+        for value in row:
+            if isinstance(value, float):
+                has_float = True
+                check_cost(value)
+            elif isinstance(value, int):
+                has_big = has_big or not -INT64_LIMIT < value < INT64_LIMIT
+            elif hasattr(value, 'dtype'):
+                has_float = has_float or value.dtype.kind == 'f'
+                check_cost(value)
+            else:
+                has_object = True
+                check_cost(value)
+
+    if has_big or has_object:
+        return OBJECT
+    return FLOAT64 if has_float else INT64
+
+
+def working_rows(matrix, kind=None):
+    # a copy of the matrix for the list based solvers with every cell of one
+    # python type: int64 costs become ints, float64 costs floats (so the hot
+    # loops never compare mixed types). Rows go through a typed array, which
+    # converts in C, but stay lists: indexing an array boxes a new object on
+    # every read and is about twice as slow in the step loops
+    if kind is None:
+        kind = cost_kind(matrix)
+    rows = [row.tolist() if hasattr(row, 'tolist') else row for row in matrix]
+    typecode = TYPECODES.get(kind)
+    if typecode is None:
+        return [list(row) for row in rows]
+    return [array(typecode, row).tolist() for row in rows]
+
+
+def has_forbidden(rows):
+    return any(FORBIDDEN in row for row in rows)
@@ -0,0 +1,195 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from costs import FORBIDDEN
+from munkres_numpy import np
+from solver import solve
+from sparse import InfeasibleError
+
+# components with at least this many rows go to the process pool
+PARALLEL_SIZE = 256
+
+
+def _find(parent, i):
+    root = i
+    while parent[root] != root:
+        root = parent[root]
+    while parent[i] != root:
+        parent[i], i = root, parent[i]
+    return root
+
+
+def _union(parent, i, k):
+    i, k = _find(parent, i), _find(parent, k)
+    if i != k:
+        parent[max(i, k)] = min(i, k)
+
+
+def components(matrix, limit=None):
+    # connected components of the bipartite graph of allowed pairs: not
+    # FORBIDDEN and, with a limit, cheaper than it. Returns (rows, cols) for
+    # every component, ordered by their first row; columns nothing may take
+    # are left out. Each row is joined to the first row that reached each of
+    # its columns, so no adjacency lists are built
+    n = len(matrix)
+    m = len(matrix[0]) if n else 0
+    parent = list(range(n))
+
+    if np is not None and isinstance(matrix, np.ndarray):
+        allowed = matrix != FORBIDDEN if limit is None else matrix < limit
+        owner = np.full(m, -1, dtype=np.intp)
+        for i in range(n):
+            cols = np.flatnonzero(allowed[i])
+            owners = owner[cols]
+            owner[cols[owners < 0]] = i
+            for k in np.unique(owners[owners >= 0]).tolist():
+                _union(parent, i, k)
+        owner = owner.tolist()
+    else:
+        owner = [-1] * m
+        for i, row in enumerate(matrix):
+            for j, value in enumerate(row):
+                if value == FORBIDDEN or (limit is not None and value >= limit):
+                    continue
+                if owner[j] < 0:
+                    owner[j] = i
+                else:
+                    _union(parent, i, owner[j])
+
+    groups = {}
+    for i in range(n):
+        groups.setdefault(_find(parent, i), ([], []))[0].append(i)
+    for j, i in enumerate(owner):
+        if i >= 0:
+            groups[_find(parent, i)][1].append(j)
+    return [groups[root] for root in sorted(groups)]
+
+
+def forced_pairs(costs, square=False):
+    # pairs every complete assignment of the rows must use: a row with one
+    # allowed column left takes it, and in a square problem so does a column
+    # with one row left. Taking a pair can leave another row or column with a
+    # single choice, that is followed until nothing changes. Raises
+    # InfeasibleError when a row (or column of a square problem) runs out
+    n = len(costs)
+    m = len(costs[0]) if n else 0
+    if min(n, m) > 1 and not any(FORBIDDEN in row for row in costs):
+        return []
+    active_rows = set(range(n))
+    active_cols = set(range(m))
+    row_degree = [m - row.count(FORBIDDEN) for row in costs]
+    col_degree = [n - col.count(FORBIDDEN) for col in zip(*costs)] if square else []
+
+    forced = []
+    while True:
+        pair = None
+        for i in active_rows:
+            if row_degree[i] <= 1:
+                cols = [j for j in active_cols if costs[i][j] != FORBIDDEN]
+                if not cols:
+                    raise InfeasibleError(i, "row %d has no allowed partner left" % i)
+                pair = i, cols[0]
+                break
+        if pair is None and square:
+            for j in active_cols:
+                if col_degree[j] <= 1:
+                    rows = [i for i in active_rows if costs[i][j] != FORBIDDEN]
+                    if not rows:
+                        raise InfeasibleError(j, "column %d has no allowed partner left" % j)
+                    pair = rows[0], j
+                    break
+        if pair is None:
+            return forced
+
+        i, j = pair
+        forced.append(pair)
+        active_rows.discard(i)
+        active_cols.discard(j)
+        for k in active_cols:
+            if costs[i][k] != FORBIDDEN:
+                col_degree[k] -= 1
+        for k in active_rows:
+            if costs[k][j] != FORBIDDEN:
+                row_degree[k] -= 1
+
+
+def _solve_component(costs, engine, limit):
+    # the assignment of one component in its own coordinates, forced pairs
+    # first, the rest by the engine. A component with as many columns as rows
+    # uses all of them, so its columns can force pairs too
+    if limit is not None:
+        costs = [[value if value < limit else FORBIDDEN for value in row] for row in costs]
+    forced = forced_pairs(costs, len(costs) == len(costs[0]))
+    if not forced:
+        return solve(costs, engine)[0]
+    if len(forced) == len(costs):
+        return forced
+
+    rows_taken = {i for i, _ in forced}
+    cols_taken = {j for _, j in forced}
+    rows = [i for i in range(len(costs)) if i not in rows_taken]
+    cols = [j for j in range(len(costs[0])) if j not in cols_taken]
+    rest = [[costs[i][j] for j in cols] for i in rows]
+    marked, _ = solve(rest, engine)
+    return forced + [(rows[i], cols[j]) for i, j in marked]
+
+
+def solve_decomposed(matrix, engine='lapjv', workers=None, parallel_size=PARALLEL_SIZE, limit=None):
+    # solver.solve for block structured matrices: the connected components of
+    # the allowed pairs (see components) are solved one by one, components of
+    # parallel_size rows and up in a process pool of `workers` processes
+    # (0 keeps them in this process), and their assignments are put back into
+    # the caller's coordinates. With a limit, pairs costing that much or more
+    # are treated as forbidden, which may make the problem infeasible.
+    # Returns (assignment, total_cost) like solver.solve
+    rows, cols = len(matrix), len(matrix[0]) if len(matrix) else 0
+    if not rows or not cols:
+        return [], 0
+    transposed = rows > cols
+    if transposed:
+        costs = matrix.T if hasattr(matrix, 'T') else [list(col) for col in zip(*matrix)]
+    else:
+        costs = matrix
+
+    parts = components(costs, limit)
+    for part_rows, part_cols in parts:
+        if len(part_rows) > len(part_cols):
+            side = 'column' if transposed else 'row'
+            raise InfeasibleError(part_rows[0], "%s %d is in a group of %d %ss that can only use %d partners" %
+                                  (side, part_rows[0], len(part_rows), side, len(part_cols)))
+
+    def block(part_rows, part_cols):
+        if np is not None and isinstance(costs, np.ndarray):
+            return costs[np.ix_(part_rows, part_cols)].tolist()
+        return [[costs[i][j] for j in part_cols] for i in part_rows]
+
+    big = [k for k, (part_rows, _) in enumerate(parts) if len(part_rows) >= parallel_size]
+    results = [None] * len(parts)
+    pool = None
+    if workers != 0 and len(big) > 1:
+        pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {}
+        if pool is not None:
+            for k in big:
+                part_rows, part_cols = parts[k]
+                futures[k] = pool.submit(_solve_component, block(part_rows, part_cols), engine, limit)
+        for k, (part_rows, part_cols) in enumerate(parts):
+            if k not in futures:
+                results[k] = _solve_component(block(part_rows, part_cols), engine, limit)
+        for k, future in futures.items():
+            results[k] = future.result()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    marked = []
+    for (part_rows, part_cols), pairs in zip(parts, results):
+        marked += [(part_rows[i], part_cols[j]) for i, j in pairs]
+    if transposed:
+        marked = [(j, i) for i, j in marked]
+    marked.sort()
+
+    total_cost = sum(matrix[i][j] for i, j in marked)
+    if hasattr(total_cost, 'item'):
+        total_cost = total_cost.item()
+    return marked, total_cost
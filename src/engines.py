@@ -0,0 +1,27 @@
+import logging
+
+from munkres import Munkres
+from munkres_numpy import NumpyMunkres, np
+from lapjv import LapJV
+from auction import Auction
+from threaded import ThreadedLapJV
+
+ENGINES = {'munkres': Munkres,
+           'numpy': NumpyMunkres,
+           'lapjv': LapJV,
+           'auction': Auction,
+           'threaded': ThreadedLapJV}
+
+# engines that solve n x m matrices without padding them to a square
+RECTANGULAR = {'lapjv', 'auction', 'threaded'}
+
+
+def make_engine(name='lapjv'):
+    if name == 'numpy' and np is None:
+        logging.warning("numpy is not installed, falling back to the pure python munkres engine")
+        name = 'munkres'
+    if name == 'threaded' and np is None:
+        logging.warning("numpy is not installed, falling back to the single threaded lapjv engine")
+        name = 'lapjv'
+
+    return ENGINES[name]()
@@ -4,10 +4,20 @@ from tkinter import filedialog as fd
 from tkinter.simpledialog import askinteger
 from tkinter.messagebox import showerror
 
+from costs import FORBIDDEN, parse_cost
+
 MARGIN = 0  # Pixels around the board
 CELL_WIDTH = 50  # Width of every board cell.
 
 
+def cell_text(value):
+    if value is None:
+        return ''
+    if value == FORBIDDEN:
+        return 'x'
+    return str(value)
+
+
 def command_help():
     about_window = tk.Toplevel()
     about_window.title('help')
@@ -53,6 +63,9 @@ class Interface:
         self._toppanel = TopPanel(self.__topframe)
         self._toppanel.solvebutton.configure(command=self.__controller.command_solve)
         self._toppanel.stepbutton.configure(command=self.__controller.command_step)
+        self._toppanel.cancelbutton.configure(command=self.__controller.command_cancel)
+        self._toppanel.backbutton.configure(command=self.__controller.command_step_back)
+        self._toppanel.tracescale.configure(command=lambda value: self.__controller.command_seek(int(value)))
 
         self.__bottomframe = tk.Frame(root)
         self.__bottomframe.pack(side=tk.BOTTOM, fill=tk.BOTH, expand=True)
@@ -73,6 +86,8 @@ class Interface:
         filemenu.add_command(label="New", command=self.new_project_window)
         filemenu.add_command(label="Open", command=self.__controller.command_open)
         filemenu.add_command(label="Save", command=self.__controller.command_save)
+        filemenu.add_command(label="Export trace", command=self.__controller.command_export_trace)
+        filemenu.add_command(label="Export step stats", command=self.__controller.command_export_stats)
 
         filemenu.add_separator()
 
@@ -87,15 +102,25 @@ class Interface:
         return menubar
 
     def open_project(self):
-        ftypes = [('CSV files', '*.csv'), ('All files', '*')]
+        ftypes = [('CSV files', '*.csv'), ('NumPy files', '*.npy'), ('All files', '*')]
         self._openpath = fd.askopenfilename(title='Open a file', initialdir='~', filetypes=ftypes)
         return self._openpath
 
     def save_project(self):
-        ftypes = [('CSV files', '*.csv'), ('All files', '*')]
+        ftypes = [('CSV files', '*.csv'), ('NumPy files', '*.npy'), ('All files', '*')]
         self._savepath = fd.asksaveasfilename(title='Save a file', initialdir='~', filetypes=ftypes)
         return self._savepath
 
+    def save_trace(self):
+        ftypes = [('JSON files', '*.json'), ('All files', '*')]
+        return fd.asksaveasfilename(title='Export the step trace', initialdir='~',
+                                    defaultextension='.json', filetypes=ftypes)
+
+    def save_stats(self):
+        ftypes = [('JSON files', '*.json'), ('All files', '*')]
+        return fd.asksaveasfilename(title='Export the step statistics', initialdir='~',
+                                    defaultextension='.json', filetypes=ftypes)
+
     def new_project_window(self):
         size = askinteger("Input", "Input the size of the matrix")
         self.__controller.command_new_matrix(size)
@@ -125,6 +150,19 @@ class TopPanel:
         self._stepbutton = tk.Button(frame, text="step")
         self._stepbutton.pack(side=tk.RIGHT, padx=20, pady=20)
 
+        self._backbutton = tk.Button(frame, text="back")
+        self._backbutton.pack(side=tk.RIGHT, padx=20, pady=20)
+
+        # scrubs through the recorded steps, 0 is the matrix before step 1
+        self._tracescale = tk.Scale(frame, orient=tk.HORIZONTAL, from_=0, to=0, length=150)
+        self._tracescale.pack(side=tk.RIGHT, padx=20)
+
+        self._cancelbutton = tk.Button(frame, text="cancel", state=tk.DISABLED)
+        self._cancelbutton.pack(side=tk.RIGHT, padx=20, pady=20)
+
+        self.__progressbar = ttk.Progressbar(frame, orient=tk.HORIZONTAL, length=150, mode='determinate')
+        self.__progressbar.pack(side=tk.RIGHT, padx=20, pady=20)
+
         self.__reslabel = tk.Label(frame, text="total cost: ")
         self.__reslabel.pack(side=tk.LEFT, padx=20, pady=20)
 
@@ -134,6 +172,22 @@ class TopPanel:
     def reset_label(self):
         self.__reslabel.config(text="total cost:")
 
+    def set_progress(self, matched, total):
+        self.__progressbar.config(maximum=max(total, 1), value=matched)
+
+    def set_trace_position(self, position, length):
+        self._tracescale.config(to=length)
+        self._tracescale.set(position)
+
+    def set_solving(self, solving):
+        self._solvebutton.config(state=tk.DISABLED if solving else tk.NORMAL)
+        self._stepbutton.config(state=tk.DISABLED if solving else tk.NORMAL)
+        self._backbutton.config(state=tk.DISABLED if solving else tk.NORMAL)
+        self._tracescale.config(state=tk.DISABLED if solving else tk.NORMAL)
+        self._cancelbutton.config(state=tk.NORMAL if solving else tk.DISABLED)
+        if solving:
+            self.__progressbar.config(value=0)
+
     @property
     def solvebutton(self):
         return self._solvebutton
@@ -142,6 +196,65 @@ class TopPanel:
     def stepbutton(self):
         return self._stepbutton
 
+    @property
+    def cancelbutton(self):
+        return self._cancelbutton
+
+    @property
+    def backbutton(self):
+        return self._backbutton
+
+    @property
+    def tracescale(self):
+        return self._tracescale
+
+
+class _ItemPool:
+    # canvas items of one kind keyed by what they show (a cell, a line, a
+    # covered row...). sync() keeps items for the wanted keys only, items that
+    # scroll out of view are hidden and handed to the next new key instead of
+    # being deleted and created again
+
+    def __init__(self, canvas, kind, tag, **options):
+        self.__canvas = canvas
+        self.__create = getattr(canvas, 'create_' + kind)
+        self.__tag = tag
+        self.__options = options
+        self.__items = {}
+        self.__configs = {}
+        self.__spare = []
+
+    def sync(self, wanted):
+        canvas = self.__canvas
+        for key in list(self.__items):
+            if key not in wanted:
+                item = self.__items.pop(key)
+                del self.__configs[key]
+                canvas.itemconfigure(item, state=tk.HIDDEN)
+                self.__spare += [item]
+
+        for key, (coords, config) in wanted.items():
+            item = self.__items.get(key)
+            if item is None:
+                if self.__spare:
+                    item = self.__spare.pop()
+                    canvas.coords(item, *coords)
+                    canvas.itemconfigure(item, state=tk.NORMAL, **config)
+                else:
+                    item = self.__create(*coords, tags=self.__tag, **self.__options, **config)
+                self.__items[key] = item
+                self.__configs[key] = config
+            elif self.__configs[key] != config:
+                # same place, new content: update in place
+                canvas.itemconfigure(item, **config)
+                self.__configs[key] = config
+
+    def clear(self):
+        self.__canvas.delete(self.__tag)
+        self.__items = {}
+        self.__configs = {}
+        self.__spare = []
+
 
 class MatrixUi:
 
@@ -152,13 +265,17 @@ class MatrixUi:
         self.__WIDTH, self.__HEIGHT = 0, 0
         self.__size = 0
 
+        self.__marked = set()
+        self.__covered_rows = []
+        self.__covered_cols = []
+
         self.__matrix_field = tk.Canvas(frame)
         self.__matrix_field.grid(row=0, column=0, sticky=tk.E + tk.W + tk.N + tk.S)
 
         self.__cellentry = tk.Entry(self.__matrix_field)
 
-        self.__scrolly = tk.Scrollbar(frame, orient="vertical", command=self.__matrix_field.yview)
-        self.__scrollx = tk.Scrollbar(frame, orient="horizontal", command=self.__matrix_field.xview)
+        self.__scrolly = tk.Scrollbar(frame, orient="vertical", command=self.__yview)
+        self.__scrollx = tk.Scrollbar(frame, orient="horizontal", command=self.__xview)
         
         self.__matrix_field.configure(xscrollcommand=self.__scrollx.set, yscrollcommand=self.__scrolly.set)
 
@@ -168,9 +285,105 @@ class MatrixUi:
         sizegrip = ttk.Sizegrip(frame)
         sizegrip.grid(row=1, column=1)
 
+        # only the cells inside the scrolled viewport own canvas items
+        self.__numbers = _ItemPool(self.__matrix_field, 'text', "numbers", fill="black")
+        self.__lines = _ItemPool(self.__matrix_field, 'line', "line", fill="black")
+        self.__marked_cells = _ItemPool(self.__matrix_field, 'rectangle', "marked", fill="dark red", outline="red")
+        self.__covered = _ItemPool(self.__matrix_field, 'rectangle', "covered", fill="blue", outline="blue")
+
         self.__matrix_field.bind("<Button-1>", self.cell_clicked)
+        self.__matrix_field.bind("<Configure>", self.__render)
         self.__cellentry.bind('<Return>', self.handle_cell_entry)
 
+    def __xview(self, *args):
+        self.__matrix_field.xview(*args)
+        self.__render()
+
+    def __yview(self, *args):
+        self.__matrix_field.yview(*args)
+        self.__render()
+
+    def __viewport(self):
+        # rows and columns (as ranges) at least partly inside the visible area
+        canvas = self.__matrix_field
+        x0, y0 = canvas.canvasx(0), canvas.canvasy(0)
+        x1 = x0 + max(canvas.winfo_width(), canvas.winfo_reqwidth())
+        y1 = y0 + max(canvas.winfo_height(), canvas.winfo_reqheight())
+
+        def cells(low, high):
+            first = max(0, int((low - MARGIN) // CELL_WIDTH))
+            last = min(self.__size, int((high - MARGIN) // CELL_WIDTH) + 1)
+            return range(first, max(first, last))
+
+        return cells(y0, y1), cells(x0, x1)
+
+    def __restack(self):
+        # covered rows/cols at the bottom, then marked cells, grid lines and
+        # the numbers on top
+        for tag in ("covered", "marked", "line", "numbers", "cursor"):
+            self.__matrix_field.tag_raise(tag)
+
+    def __render(self, event=None):
+        rows, cols = self.__viewport()
+        self.__render_covered(rows, cols)
+        self.__render_marked(rows, cols)
+        self.__render_lines(rows, cols)
+        self.__render_numbers(rows, cols)
+        return event
+
+    def __render_numbers(self, rows, cols):
+        wanted = {}
+        for i in rows:
+            y = MARGIN + i * CELL_WIDTH + CELL_WIDTH / 2
+            for j in cols:
+                cell_value = self.__controller.get_cost_matrix(i, j)
+                x = MARGIN + j * CELL_WIDTH + CELL_WIDTH / 2
+                wanted[(i, j)] = ((x, y), {'text': cell_text(cell_value)})
+        self.__numbers.sync(wanted)
+        self.__restack()
+
+    def __render_lines(self, rows, cols):
+        wanted = {}
+        for i in range(rows.start, rows.stop + 1 if rows else rows.start):
+            y = MARGIN + i * CELL_WIDTH
+            wanted[('row', i)] = ((MARGIN, y, self.__WIDTH + MARGIN, y), {})
+        for j in range(cols.start, cols.stop + 1 if cols else cols.start):
+            x = MARGIN + j * CELL_WIDTH
+            wanted[('col', j)] = ((x, MARGIN, x, self.__HEIGHT + MARGIN), {})
+        self.__lines.sync(wanted)
+        self.__restack()
+
+    def __render_marked(self, rows, cols):
+        wanted = {}
+        for row, col in self.__marked:
+            if row in rows and col in cols:
+                x0 = MARGIN + col * CELL_WIDTH + 1
+                y0 = MARGIN + row * CELL_WIDTH + 1
+                x1 = MARGIN + (col + 1) * CELL_WIDTH - 1
+                y1 = MARGIN + (row + 1) * CELL_WIDTH - 1
+                wanted[(row, col)] = ((x0, y0, x1, y1), {})
+        self.__marked_cells.sync(wanted)
+        self.__restack()
+
+    def __render_covered(self, rows, cols):
+        wanted = {}
+        for i in rows:
+            if i < len(self.__covered_rows) and self.__covered_rows[i]:
+                x0 = MARGIN + 0
+                y0 = MARGIN + i * CELL_WIDTH + 1
+                x1 = MARGIN + self.__size * CELL_WIDTH - 1
+                y1 = MARGIN + (i + 1) * CELL_WIDTH - 1
+                wanted[('row', i)] = ((x0, y0, x1, y1), {})
+        for i in cols:
+            if i < len(self.__covered_cols) and self.__covered_cols[i]:
+                x0 = MARGIN + i * CELL_WIDTH + 1
+                y0 = MARGIN + 0
+                x1 = MARGIN + (i + 1) * CELL_WIDTH - 1
+                y1 = MARGIN + self.__size * CELL_WIDTH - 1
+                wanted[('col', i)] = ((x0, y0, x1, y1), {})
+        self.__covered.sync(wanted)
+        self.__restack()
+
     def init_empty_matrix(self, size):
         self.__size = int(size)
 
@@ -179,24 +392,14 @@ class MatrixUi:
 
         self.__matrix_field.configure(scrollregion=(0, 0, self.__WIDTH, self.__HEIGHT))
 
-        self.__matrix_field.delete("line")
-        self.__matrix_field.delete("numbers")
-        self.__matrix_field.delete("marked")
-        self.__matrix_field.delete("covered")
-        for i in range(int(size) + 1):
-            color = "black"
-
-            x0 = MARGIN + i * CELL_WIDTH
-            y0 = MARGIN
-            x1 = MARGIN + i * CELL_WIDTH
-            y1 = self.__HEIGHT + MARGIN
-            self.__matrix_field.create_line(x0, y0, x1, y1, tags="line", fill=color)
-
-            x0 = MARGIN
-            y0 = MARGIN + i * CELL_WIDTH
-            x1 = self.__WIDTH + MARGIN
-            y1 = MARGIN + i * CELL_WIDTH
-            self.__matrix_field.create_line(x0, y0, x1, y1, tags="line", fill=color)
+        self.__marked = set()
+        self.__covered_rows = []
+        self.__covered_cols = []
+        self.__numbers.clear()
+        self.__lines.clear()
+        self.__marked_cells.clear()
+        self.__covered.clear()
+        self.__render()
 
         self.__matrix_field.focus_set()
 
@@ -204,33 +407,11 @@ class MatrixUi:
         # Width and height of the whole board
         self.__WIDTH = self.__HEIGHT = CELL_WIDTH * self.__size
 
-        for i in range(self.__size + 1):
-            color = "black"
-
-            x0 = MARGIN + i * CELL_WIDTH
-            y0 = MARGIN
-            x1 = MARGIN + i * CELL_WIDTH
-            y1 = self.__HEIGHT + MARGIN
-            self.__matrix_field.create_line(x0, y0, x1, y1, tags="line", fill=color)
-
-            x0 = MARGIN
-            y0 = MARGIN + i * CELL_WIDTH
-            x1 = self.__WIDTH + MARGIN
-            y1 = MARGIN + i * CELL_WIDTH
-            self.__matrix_field.create_line(x0, y0, x1, y1, tags="line", fill=color)
-
+        self.__render_lines(*self.__viewport())
         self.__matrix_field.focus_set()
 
     def fill_matrix(self):
-        self.__matrix_field.delete("numbers")
-        for i in range(int(self.__size)):
-            for j in range(int(self.__size)):
-                cell_value = self.__controller.get_cost_matrix(i, j)
-                x = MARGIN + j * CELL_WIDTH + CELL_WIDTH / 2
-                y = MARGIN + i * CELL_WIDTH + CELL_WIDTH / 2
-                color = "black"
-                self.__matrix_field.create_text(x, y, text=cell_value, tags="numbers", fill=color)
-        
+        self.__render_numbers(*self.__viewport())
         self.__matrix_field.focus_set()
 
     def cell_clicked(self, event):
@@ -272,12 +453,18 @@ class MatrixUi:
             value = self.__controller.get_cost_matrix(self.__row, self.__col)
             if value is not None:
                 self.__cellentry.delete(0, tk.END)
-                self.__cellentry.insert(tk.END, str(value))
+                self.__cellentry.insert(tk.END, cell_text(value))
             self.__cellentry.focus_set()
 
     def handle_cell_entry(self, event):
-        if self.__row >= 0 and self.__col >= 0 and self.__cellentry.get().isdigit():
-            self.__controller.set_cost_matrix(self.__row, self.__col, int(self.__cellentry.get()))
+        if self.__row >= 0 and self.__col >= 0:
+            # negatives, decimals, 1e3 and x (forbidden) are fine, other text
+            # is ignored
+            try:
+                value = parse_cost(self.__cellentry.get())
+            except ValueError:
+                return event
+            self.__controller.set_cost_matrix(self.__row, self.__col, value)
 
             # move to the next cell if it not the end of the matrix
             if self.__row >= self.__size-1:
@@ -286,34 +473,16 @@ class MatrixUi:
             else:
                 self.__row = self.__row + 1
                 self.__cellentry.delete(0, tk.END)
+            # only the edited cell's text item changes
             self.fill_matrix()
             self.draw_cursor()
         return event
 
     def draw_marked(self, res):
-        self.__matrix_field.delete("marked")
-        for row, col in res:
-            x0 = MARGIN + col * CELL_WIDTH + 1
-            y0 = MARGIN + row * CELL_WIDTH + 1
-            x1 = MARGIN + (col + 1) * CELL_WIDTH - 1
-            y1 = MARGIN + (row + 1) * CELL_WIDTH - 1
-
-            self.__matrix_field.create_rectangle(x0, y0, x1, y1, fill="dark red", outline="red", tags="marked")
+        self.__marked = set(res)
+        self.__render_marked(*self.__viewport())
 
     def draw_covered(self, rows, cols):
-        self.__matrix_field.delete("covered")
-        for i, row in enumerate(rows):
-            if row:
-                x0 = MARGIN + 0
-                y0 = MARGIN + i * CELL_WIDTH + 1
-                x1 = MARGIN + self.__size * CELL_WIDTH - 1
-                y1 = MARGIN + (i + 1) * CELL_WIDTH - 1
-                self.__matrix_field.create_rectangle(x0, y0, x1, y1, fill="blue", outline="blue", tags="covered")
-        
-        for i, col in enumerate(cols):
-            if col:
-                x0 = MARGIN + i * CELL_WIDTH + 1
-                y0 = MARGIN + 0
-                x1 = MARGIN + (i + 1) * CELL_WIDTH - 1
-                y1 = MARGIN + self.__size * CELL_WIDTH - 1
-                self.__matrix_field.create_rectangle(x0, y0, x1, y1, fill="blue", outline="blue", tags="covered")
+        self.__covered_rows = list(rows)
+        self.__covered_cols = list(cols)
+        self.__render_covered(*self.__viewport())
@@ -0,0 +1,222 @@
+import heapq
+import itertools
+import math
+
+from lapjv import LapJV
+from loader import to_lists
+from sparse import InfeasibleError
+
+
+class _Node:
+    # a solved subproblem: rows pinned to a column (forced), pairs it may not
+    # use (excluded), and the optimal duals and matching under them. Children
+    # partition what is left over the real rows that are not forced
+    __slots__ = ('forced', 'excluded', 'u', 'v', 'col4row', 'cost', 'free_rows', 'slack')
+
+    def __init__(self, forced, excluded, u, v, col4row, cost, n_real):
+        self.forced = forced
+        self.excluded = excluded
+        self.u = u
+        self.v = v
+        self.col4row = col4row
+        self.cost = cost
+        pinned = {i for i, _ in forced}
+        self.free_rows = [i for i in range(n_real) if i not in pinned]
+        self.slack = None
+
+
+class _Murty:
+    # works on a square matrix: a tall one is transposed, a wide one gets
+    # zero-cost dummy rows that are never partitioned on, so two assignments
+    # that only differ in the dummy rows are not both reported
+
+    def __init__(self, matrix):
+        base = to_lists(matrix)
+        self.transposed = len(base) > len(base[0])
+        if self.transposed:
+            base = [list(col) for col in zip(*base)]
+        self.n_real = len(base)
+        self.n = len(base[0])
+        self.C = base + [[0] * self.n for _ in range(self.n - self.n_real)]
+
+    def total(self, col4row):
+        return sum(self.C[i][col4row[i]] for i in range(self.n_real))
+
+    def root(self):
+        solver = LapJV()
+        solver.setup(self.C)
+        solver.solve_all()
+        u, v = solver.get_potentials()
+        col4row = solver.get_assignment()[:]
+        return _Node([], [], u[:], v[:], col4row, self.total(col4row), self.n_real)
+
+    def marked(self, node):
+        if self.transposed:
+            return sorted((j, i) for i, j in enumerate(node.col4row[:self.n_real]))
+        return list(enumerate(node.col4row[:self.n_real]))
+
+    def constraints(self, parent, t):
+        # child t keeps the first t free rows of its parent and may not use
+        # the pair of row t
+        row = parent.free_rows[t]
+        forced = parent.forced + [(i, parent.col4row[i]) for i in parent.free_rows[:t]]
+        excluded = parent.excluded + [(row, parent.col4row[row])]
+        banned = {}
+        for i, j in excluded:
+            banned.setdefault(i, set()).add(j)
+        return row, forced, excluded, banned
+
+    def slack(self, parent):
+        # the cheapest reduced cost under the parent's duals of a pair other
+        # than the matched one, per row and per column (at least 0: the pairs
+        # a child may use are never negative). Shared by all of its children
+        if parent.slack is None:
+            C, u, v = self.C, parent.u, parent.v
+            reduced = []
+            for i, j in enumerate(parent.col4row):
+                ui = u[i]
+                row = [value - vj - ui for value, vj in zip(C[i], v)]
+                row[j] = math.inf
+                reduced.append(row)
+            parent.slack = ([max(min(row), 0) for row in reduced],
+                            [max(min(col), 0) for col in zip(*reduced)])
+        return parent.slack
+
+    def lower_bound(self, parent, t):
+        # the repair path leaves row t through another column and reaches its
+        # old column from another row, both pairs cost at least their reduced
+        # cost under the parent's duals
+        row = parent.free_rows[t]
+        leave, enter = self.slack(parent)
+        return parent.cost + leave[row] + enter[parent.col4row[row]]
+
+    def solve(self, parent, t, limit=math.inf):
+        # one Dijkstra augmentation from the freed row over the allowed pairs,
+        # starting from the parent's duals which stay feasible as pairs are
+        # only taken away. None when the subproblem has no assignment. The
+        # search gives up once every path left would make the child cost more
+        # than limit and returns the lower bound it proved instead of a node
+        row, forced, excluded, banned = self.constraints(parent, t)
+        n, C = self.n, self.C
+        u, v = parent.u[:], parent.v[:]
+        col4row = parent.col4row[:]
+        row4col = [-1] * n
+        for i, j in enumerate(col4row):
+            row4col[j] = i
+        forced_cols = {j for _, j in forced}
+        row4col[col4row[row]] = -1
+        col4row[row] = -1
+
+        remaining = [j for j in range(n) if j not in forced_cols]
+        shortest = [math.inf] * n
+        path = [-1] * n
+        scanned_rows = []
+        scanned_cols = []
+
+        skip = banned.get(row, ())
+        cheapest = [C[row][j] - v[j] for j in remaining if j not in skip]
+        if not cheapest:
+            return None
+        u[row] = min(cheapest)
+        # the child costs the parent's cost, plus what row t's dual rose by,
+        # plus the length of the path
+        base = parent.cost + u[row] - parent.u[row]
+
+        min_val = 0
+        sink = -1
+        i = row
+        while sink < 0:
+            scanned_rows.append(i)
+            costs = C[i]
+            ui = u[i]
+            skip = banned.get(i, ())
+            lowest = math.inf
+            index = -1
+            for it in range(len(remaining)):
+                j = remaining[it]
+                if j not in skip:
+                    r = min_val + costs[j] - ui - v[j]
+                    if r < shortest[j]:
+                        path[j] = i
+                        shortest[j] = r
+                if shortest[j] < lowest or (shortest[j] == lowest and row4col[j] < 0):
+                    lowest = shortest[j]
+                    index = it
+
+            if lowest == math.inf:
+                return None
+            if base + lowest > limit:
+                return base + lowest
+            min_val = lowest
+            j = remaining[index]
+            if row4col[j] < 0:
+                sink = j
+            else:
+                i = row4col[j]
+            scanned_cols.append(j)
+            remaining[index] = remaining[-1]
+            remaining.pop()
+
+        u[row] += min_val
+        for i in scanned_rows:
+            if i != row:
+                u[i] += min_val - shortest[col4row[i]]
+        for j in scanned_cols:
+            v[j] -= min_val - shortest[j]
+
+        j = sink
+        while True:
+            i = path[j]
+            row4col[j] = i
+            col4row[i], j = j, col4row[i]
+            if i == row:
+                break
+
+        return _Node(forced, excluded, u, v, col4row, self.total(col4row), self.n_real)
+
+
+def kbest(matrix):
+    # yields (assignment, total_cost) from the cheapest on, in non-decreasing
+    # cost, with Murty's partitioning. Children are queued at their parent's
+    # cost; one that comes up gets a cheap lower bound first and is only
+    # solved (one augmentation from the parent's duals and matching, never a
+    # full solve) when it comes up again. That search stops as soon as it
+    # proves the child costs more than the next queue entry, and the child
+    # goes back at that bound, so only children that are about to be yielded
+    # are solved to the end. forbidden pairs (costs.FORBIDDEN) are never
+    # used, an infeasible matrix yields nothing
+    if not len(matrix) or not len(matrix[0]):
+        return
+    murty = _Murty(matrix)
+    try:
+        root = murty.root()
+    except InfeasibleError:
+        return
+
+    counter = itertools.count()
+    # (cost, state, tie breaker, item): state 0 is a solved node, 1 a child
+    # at its parent's cost and 2 a child at its lower bound
+    queue = [(root.cost, 0, next(counter), root)]
+    while queue:
+        cost, state, _, item = heapq.heappop(queue)
+        if state == 0:
+            yield murty.marked(item), cost
+            for t in range(len(item.free_rows)):
+                heapq.heappush(queue, (cost, 1, next(counter), (item, t)))
+            continue
+
+        parent, t = item
+        if state == 1:
+            bound = murty.lower_bound(parent, t)
+            if bound == math.inf:
+                continue
+            if bound > cost:
+                heapq.heappush(queue, (bound, 2, next(counter), item))
+                continue
+
+        # a search that cannot finish below the next entry only raises the bound
+        child = murty.solve(parent, t, queue[0][0] if queue else math.inf)
+        if isinstance(child, _Node):
+            heapq.heappush(queue, (child.cost, 0, next(counter), child))
+        elif child is not None:
+            heapq.heappush(queue, (child, 2, next(counter), item))
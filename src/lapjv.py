@@ -0,0 +1,280 @@
+import math
+
+from costs import FORBIDDEN, check_cost, cost_kind, has_forbidden
+from sparse import check_feasible
+
+
+class LapJV:
+
+    def __init__(self):
+        self.__matrix = None
+        self.__C = None
+        self.__n = 0
+        self.__m = 0
+        self.__transposed = False
+        self.__u = []
+        self.__v = []
+        self.__col4row = []
+        self.__row4col = []
+        self.__shortest = []
+        self.__path = []
+        self.__scanned_rows = []
+        self.__scanned_cols = []
+        self.__solved = False
+        self.__forbidden = False
+        self.__progress = None
+        self.__cancelled = False
+
+    def setup(self, cost_matrix):
+        # an n x m matrix is solved as it is: every row of the smaller side is
+        # assigned to a distinct column of the larger one. The solver works on
+        # the caller's lists when n <= m and on a transposed copy otherwise
+        rows, cols = len(cost_matrix), len(cost_matrix[0])
+        # raises ValueError for NaN and -inf costs, augmenting would not end
+        cost_kind(cost_matrix)
+        self.__matrix = cost_matrix
+        self.__transposed = rows > cols
+        if self.__transposed:
+            self.__C = [list(col) for col in zip(*cost_matrix)]
+            rows, cols = cols, rows
+        else:
+            self.__C = cost_matrix
+        self.__solved = False
+        self.__forbidden = has_forbidden(self.__C)
+
+        if (rows, cols) != (self.__n, self.__m) or not self.__u:
+            self.__n, self.__m = rows, cols
+            self.__u = [0] * rows
+            self.__v = [0] * cols
+            self.__col4row = [-1] * rows
+            self.__row4col = [-1] * cols
+            self.__shortest = [math.inf] * cols
+            self.__path = [-1] * cols
+            self.__scanned_rows = [False] * rows
+            self.__scanned_cols = [False] * cols
+
+    def set_progress(self, callback):
+        # callback(matched, n) runs after every augmentation, returning False
+        # from it stops solve_all/resolve with the matching left partial
+        self.__progress = callback
+
+    def is_cancelled(self):
+        return self.__cancelled
+
+    def get_marked(self):
+        results = []
+        if self.__transposed:
+            for j in range(self.__m):
+                i = self.__row4col[j]
+                if i >= 0:
+                    results += [(j, i)]
+        else:
+            for i in range(self.__n):
+                j = self.__col4row[i]
+                if j >= 0:
+                    results += [(i, j)]
+
+        return results
+
+    def get_assignment(self):
+        # column of every row of the caller's matrix, -1 when it is not assigned
+        if self.__transposed:
+            return self.__row4col
+        return self.__col4row
+
+    def get_potentials(self):
+        return self.__u, self.__v
+
+    def solve_all(self):
+        u, v = self.__u, self.__v
+        col4row, row4col = self.__col4row, self.__row4col
+        for i in range(self.__n):
+            u[i] = 0
+            col4row[i] = -1
+        for j in range(self.__m):
+            v[j] = 0
+            row4col[j] = -1
+
+        # column reduction is only valid when every column ends up assigned,
+        # a rectangular problem keeps v = 0 on the columns left free
+        if self.__forbidden:
+            check_feasible(self.__C)
+        if self.__n == self.__m:
+            self.__column_reduction()
+
+        self.__solved = self.__augment_free_rows()
+
+    def set_cell(self, row, col, value):
+        check_cost(value)
+        self.__matrix[row][col] = value
+        self.__forbidden = self.__forbidden or value == FORBIDDEN
+        if self.__transposed:
+            self.__C[col][row] = value
+            row, col = col, row
+
+        if self.__solved and (self.__col4row[row] == col or
+                              value - self.__u[row] - self.__v[col] < 0):
+            self.__free_row(row)
+
+    def set_row(self, row, values):
+        cost_kind([values])
+        self.__matrix[row][:] = values
+        self.__forbidden = self.__forbidden or FORBIDDEN in values
+        if self.__transposed:
+            self.__update_col(row, values)
+        else:
+            self.__update_row(row)
+
+    def set_col(self, col, values):
+        cost_kind([values])
+        self.__forbidden = self.__forbidden or FORBIDDEN in values
+        for i, value in enumerate(values):
+            self.__matrix[i][col] = value
+        if self.__transposed:
+            self.__C[col][:] = values
+            self.__update_row(col)
+        else:
+            self.__update_col(col, values)
+
+    def resolve(self):
+        # warm start: the duals and the matching kept from the last solve stay
+        # optimal for every row that set_cell/set_row/set_col did not free, so
+        # only the freed rows are augmented, O(n*m) each
+        if not self.__solved:
+            self.solve_all()
+            return
+
+        if self.__forbidden:
+            check_feasible(self.__C)
+        self.__solved = self.__augment_free_rows()
+
+    def __augment_free_rows(self):
+        col4row = self.__col4row
+        progress = self.__progress
+        self.__cancelled = False
+        matched = self.__n - col4row.count(-1)
+        for i in range(self.__n):
+            if col4row[i] < 0:
+                self.__augment(i)
+                matched += 1
+                if progress is not None and progress(matched, self.__n) is False:
+                    self.__cancelled = True
+                    return False
+        return True
+
+    def __update_row(self, row):
+        if self.__solved:
+            self.__free_row(row)
+
+    def __update_col(self, col, values):
+        C = self.__C
+        if self.__transposed:
+            for i, value in enumerate(values):
+                C[i][col] = value
+
+        if self.__solved:
+            # the lowest v[col] that keeps every reduced cost of the column
+            # non-negative, its row is freed if it lost its zero
+            u, v = self.__u, self.__v
+            v[col] = min(C[i][col] - u[i] for i in range(self.__n))
+            if self.__n < self.__m:
+                v[col] = min(v[col], 0)
+            i = self.__row4col[col]
+            if i >= 0 and C[i][col] - u[i] - v[col] != 0:
+                self.__free_row(i)
+            elif i < 0 and v[col] < 0:
+                self.__solved = False
+
+    def __free_row(self, row):
+        col = self.__col4row[row]
+        if col >= 0:
+            self.__row4col[col] = -1
+            self.__col4row[row] = -1
+            # a free column of a rectangular problem must keep v = 0, if it
+            # cannot the next resolve() starts over
+            if self.__n < self.__m and self.__v[col] < 0:
+                self.__solved = False
+
+    def __column_reduction(self):
+        # v[j] is the column minimum, so every reduced cost c[i][j] - v[j] is
+        # non-negative; a free row that owns a column minimum is matched for free
+        n = self.__n
+        C = self.__C
+        for j in range(n - 1, -1, -1):
+            imin = 0
+            for i in range(1, n):
+                if C[i][j] < C[imin][j]:
+                    imin = i
+            self.__v[j] = C[imin][j]
+            if self.__col4row[imin] < 0:
+                self.__col4row[imin] = j
+                self.__row4col[j] = imin
+
+    def __augment(self, cur_row):
+        # Dijkstra over reduced costs c[i][j] - u[i] - v[j] from a free row
+        # until a free column is reached, then shift duals and flip the path
+        n, m = self.__n, self.__m
+        C = self.__C
+        u, v = self.__u, self.__v
+        col4row, row4col = self.__col4row, self.__row4col
+
+        shortest, path = self.__shortest, self.__path
+        scanned_rows, scanned_cols = self.__scanned_rows, self.__scanned_cols
+        remaining = list(range(m - 1, -1, -1))
+
+        # a free row may carry a stale dual after an update
+        row = C[cur_row]
+        u[cur_row] = min(row[j] - v[j] for j in range(m))
+
+        min_val = 0
+        sink = -1
+        i = cur_row
+        while sink < 0:
+            scanned_rows[i] = True
+            row = C[i]
+            ui = u[i]
+            lowest = math.inf
+            index = -1
+            for it in range(len(remaining)):
+                j = remaining[it]
+                r = min_val + row[j] - ui - v[j]
+                if r < shortest[j]:
+                    path[j] = i
+                    shortest[j] = r
+                if shortest[j] < lowest or (shortest[j] == lowest and row4col[j] < 0):
+                    lowest = shortest[j]
+                    index = it
+
+            min_val = lowest
+            j = remaining[index]
+            if row4col[j] < 0:
+                sink = j
+            else:
+                i = row4col[j]
+
+            scanned_cols[j] = True
+            remaining[index] = remaining[-1]
+            remaining.pop()
+
+        u[cur_row] += min_val
+        for i in range(n):
+            if scanned_rows[i] and i != cur_row:
+                u[i] += min_val - shortest[col4row[i]]
+        for j in range(m):
+            if scanned_cols[j]:
+                v[j] -= min_val - shortest[j]
+
+        j = sink
+        while True:
+            i = path[j]
+            row4col[j] = i
+            col4row[i], j = j, col4row[i]
+            if i == cur_row:
+                break
+
+        for i in range(n):
+            scanned_rows[i] = False
+        for j in range(m):
+            shortest[j] = math.inf
+            path[j] = -1
+            scanned_cols[j] = False
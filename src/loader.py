@@ -0,0 +1,166 @@
+import csv
+import os
+from array import array
+
+from costs import FORBIDDEN, FORBIDDEN_TEXT, INT64, TYPECODES, cost_kind, parse_cost, text_kind, widest
+from munkres_numpy import np
+
+DTYPES = {'int64': 'int64', 'float64': 'float64', 'object': object}
+
+
+def _csv_shape(filepath):
+    # the shape and the cost type (see costs.py) the cells need
+    rows = cols = 0
+    kind = INT64
+    with open(filepath, 'r', newline='') as csvfile:
+        for line in csv.reader(csvfile, delimiter=','):
+            if line:
+                rows += 1
+                cols = max(cols, len(line))
+                kind = widest([kind] + [text_kind(cell) for cell in line])
+    return rows, cols, kind
+
+
+def _csv_rows(csvfile):
+    for line in csv.reader(csvfile, delimiter=','):
+        if line:
+            yield list(map(parse_cost, line))
+
+
+def _fill(shape, rows, pad_value, kind=INT64):
+    kind = widest([kind, cost_kind([[pad_value]])])
+    if np is not None:
+        matrix = np.full(shape, pad_value, dtype=DTYPES[kind])
+        for i, row in enumerate(rows):
+            matrix[i, :len(row)] = row
+        return matrix
+
+    typecode = TYPECODES.get(kind)
+    if typecode is None:
+        matrix = [[pad_value] * shape[1] for _ in range(shape[0])]
+        for i, row in enumerate(rows):
+            matrix[i][:len(row)] = row
+        return matrix
+
+    matrix = [array(typecode, [pad_value]) * shape[1] for _ in range(shape[0])]
+    for i, row in enumerate(rows):
+        matrix[i][:len(row)] = array(typecode, row)
+    return matrix
+
+
+def load_csv(filepath, pad_value=0, square=True):
+    # two passes over the file: the first one only measures it, the second
+    # parses every row straight into a preallocated buffer that is already
+    # padded with pad_value (to a square unless square is False), nothing is
+    # copied afterwards
+    rows, cols, kind = _csv_shape(filepath)
+    if square:
+        rows = cols = max(rows, cols)
+
+    with open(filepath, 'r', newline='') as csvfile:
+        return _fill((rows, cols), _csv_rows(csvfile), pad_value, kind)
+
+
+def read_csv(csvfile, pad_value=0, square=True):
+    # single pass for streams that cannot be read twice, such as stdin
+    lines = list(_csv_rows(csvfile))
+    rows, cols = len(lines), max(map(len, lines), default=0)
+    if square:
+        rows = cols = max(rows, cols)
+
+    return _fill((rows, cols), lines, pad_value, cost_kind(lines))
+
+
+def load_npy(filepath, pad_value=0, square=True):
+    # a square .npy file is memory-mapped copy-on-write: it opens without
+    # reading the data and edits never reach the file
+    if np is None:
+        raise ImportError("loading .npy files requires numpy")
+
+    matrix = np.load(filepath, mmap_mode='c')
+    return _pad_array(matrix, pad_value) if square else matrix
+
+
+def load_raw(filepath, rows, cols, dtype='<i8', pad_value=0, square=True):
+    if np is None:
+        raise ImportError("loading raw matrices requires numpy")
+
+    matrix = np.memmap(filepath, dtype=dtype, mode='c', shape=(rows, cols))
+    return _pad_array(matrix, pad_value) if square else matrix
+
+
+def _pad_array(matrix, pad_value):
+    if matrix.ndim != 2:
+        raise ValueError("expected a 2-D matrix, got shape %s" % (matrix.shape,))
+
+    rows, cols = matrix.shape
+    if rows == cols:
+        return matrix
+
+    size = max(rows, cols)
+    padded = np.full((size, size), pad_value, dtype=matrix.dtype)
+    padded[:rows, :cols] = matrix
+    return padded
+
+
+def load_matrix(filepath, pad_value=0, square=True):
+    if os.path.splitext(filepath)[1].lower() == '.npy':
+        return load_npy(filepath, pad_value, square)
+    return load_csv(filepath, pad_value, square)
+
+
+def save_matrix(filepath, matrix):
+    if os.path.splitext(filepath)[1].lower() == '.npy':
+        if np is None:
+            raise ImportError("saving .npy files requires numpy")
+        np.save(filepath, np.asarray(matrix))
+        return
+
+    whole = integral(matrix)
+    with open(filepath, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerows([_cell_text(value, whole) for value in row] for row in to_lists(matrix))
+
+
+def _cell_text(value, whole):
+    if value == FORBIDDEN:
+        return FORBIDDEN_TEXT[0]
+    return int(value) if whole and isinstance(value, float) else value
+
+
+def integral(matrix):
+    # a CSV file of integers with forbidden (x) cells loads as float64, the
+    # only type that holds FORBIDDEN next to them. Such a matrix (forbidden
+    # cells, every other cost a whole number) is saved and totalled as
+    # integers again
+    if np is not None and isinstance(matrix, np.ndarray):
+        if matrix.dtype.kind != 'f':
+            return False
+        allowed = matrix[matrix != FORBIDDEN]
+        return allowed.size < matrix.size and bool(np.all(np.mod(allowed, 1) == 0))
+
+    forbidden = False
+    for row in matrix:
+        for value in row:
+            if value == FORBIDDEN:
+                forbidden = True
+            elif isinstance(value, float) and not value.is_integer():
+                return False
+    return forbidden
+
+
+def whole_lists(matrix):
+    # to_lists, with the costs of an integral matrix back to ints
+    rows = to_lists(matrix)
+    if not integral(rows):
+        return rows
+    return [[value if value == FORBIDDEN or not isinstance(value, float) else int(value) for value in row]
+            for row in rows]
+
+
+def to_lists(matrix):
+    # plain python lists for the list based solvers, ndarray.tolist and
+    # array.tolist both convert in C
+    if hasattr(matrix, 'tolist'):
+        return matrix.tolist()
+    return [row.tolist() if hasattr(row, 'tolist') else list(row) for row in matrix]
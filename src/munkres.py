@@ -1,11 +1,17 @@
+import heapq
 import logging
-import sys
+import math
+import time
+
+from costs import cost_kind, has_forbidden, working_rows
+from sparse import check_feasible
 
 
 class Munkres:
 
     def __init__(self):
         self.__C = None
+        self.__forbidden = False
         self.__row_covered = []
         self.__col_covered = []
         self.__n = 0
@@ -13,11 +19,29 @@ class Munkres:
         self.__original_width = 0
         self.__z_r = 0
         self.__z_c = 0
-        self.__marked = None
-        self.__path = None
+        self.__star_in_row = []
+        self.__star_in_col = []
+        self.__prime_in_row = []
+        self.__path_rows = []
+        self.__path_cols = []
+        self.__zeros = []
+        self.__zero_rows = []
+        self.__candidates = []
+        self.__progress = None
+        self.__cancelled = False
+        self.__trace = None
+        self.__shifts = None
+        self.__hook = None
 
     def setup(self, cost_matrix):
-        self.__C = cost_matrix
+        # steps 1 and 6 reduce a working copy, the caller's matrix (lists,
+        # typed rows or an ndarray) is only read. The copy is typed after the
+        # costs (int64 / float64 rows or python objects, see costs.py)
+        kind = cost_kind(cost_matrix)
+        self.__C = working_rows(cost_matrix, kind)
+        # forbidden (infinite) pairs are never a zero nor the smallest cost,
+        # the steps only need to know that a complete assignment exists
+        self.__forbidden = has_forbidden(self.__C)
         self.__n = len(self.__C)
         self.__original_length = len(cost_matrix)
         self.__original_width = len(cost_matrix[0])
@@ -25,8 +49,42 @@ class Munkres:
         self.__col_covered = [False for _ in range(self.__n)]
         self.__z_r = 0
         self.__z_c = 0
-        self.__path = self.__make_matrix(self.__n * 2, 0)
-        self.__marked = self.__make_matrix(self.__n, 0)
+        # the column starred in every row, the row starred in every column and
+        # the column primed in every row (-1 for none); step 4 primes at most
+        # one zero per row. An augmenting path visits at most 2n cells
+        self.__star_in_row = [-1] * self.__n
+        self.__star_in_col = [-1] * self.__n
+        self.__prime_in_row = [-1] * self.__n
+        self.__path_rows = [0] * (self.__n * 2)
+        self.__path_cols = [0] * (self.__n * 2)
+        self.__zeros = [[] for _ in range(self.__n)]
+        self.__zero_rows = [[] for _ in range(self.__n)]
+        self.__candidates = []
+        self.__cancelled = False
+        if self.__trace is not None:
+            self.__trace.start(cost_matrix)
+
+    def set_progress(self, callback):
+        # callback(matched, n) runs after every count of starred zeros,
+        # returning False from it stops solve_all before the next step
+        self.__progress = callback
+
+    def is_cancelled(self):
+        return self.__cancelled
+
+    def set_trace(self, trace):
+        # a steptrace.StepTrace that gets the delta of every step from the
+        # next setup on, None turns recording off
+        self.__trace = trace
+
+    def set_hook(self, hook):
+        # hook.on_step(step, next_step, seconds) after every step,
+        # hook.on_scan(name) for every full-matrix scan (__find_smallest),
+        # hook.on_lookup(name) for every look into the zero index
+        # (__find_a_zero) and hook.on_augment(length) for every augmenting
+        # path; stats.SolveStats
+        # collects them. None (the default) skips all of it
+        self.__hook = hook
 
     def get_col_covered(self):
         return self.__col_covered
@@ -37,13 +95,16 @@ class Munkres:
     def get_marked(self):
         results = []
         for i in range(self.__original_length):
-            for j in range(self.__original_width):
-                if self.__marked[i][j] == 1:
-                    results += [(i, j)]
+            j = self.__star_in_row[i]
+            if 0 <= j < self.__original_width:
+                results += [(i, j)]
 
         return results
 
     def solve_all(self):
+        if self.__forbidden:
+            check_feasible(self.__C)
+
         done = False
         step = 1
 
@@ -56,10 +117,9 @@ class Munkres:
 
         while not done:
             try:
-                if step == 7:
+                if step == 7 or self.__cancelled:
                     break
-                func = steps[step]
-                step = func()
+                step = self.__run_step(step, steps[step])
             except KeyError:
                 print("the key is invalid")
                 done = True
@@ -80,21 +140,57 @@ class Munkres:
         try:
             if step == 7:
                 return
-            func = steps[step]
-            step = func()
-            return step
+            return self.__run_step(step, steps[step])
         except KeyError:
             print("the key is invalid")
         except Exception as e:
             print("unexpected error")
             logging.exception(e)
 
+    def __run_step(self, step, func):
+        if self.__trace is not None:
+            return self.__record_step(step, func)
+        if self.__hook is not None:
+            return self.__timed_step(step, func)
+        return func()
+
+    def __timed_step(self, step, func):
+        start = time.perf_counter()
+        next_step = func()
+        self.__hook.on_step(step, next_step, time.perf_counter() - start)
+        return next_step
+
+    def __record_step(self, step, func):
+        row_covered = self.__row_covered[:]
+        col_covered = self.__col_covered[:]
+        star_in_row = self.__star_in_row[:]
+        prime_in_row = self.__prime_in_row[:]
+        self.__shifts = ([], [])
+        next_step = func() if self.__hook is None else self.__timed_step(step, func)
+
+        n = self.__n
+        marks = []
+        for i in range(n):
+            if star_in_row[i] != self.__star_in_row[i] or prime_in_row[i] != self.__prime_in_row[i]:
+                old = self.__row_marks(star_in_row[i], prime_in_row[i])
+                new = self.__row_marks(self.__star_in_row[i], self.__prime_in_row[i])
+                marks += [(i, j, old.get(j, 0), new.get(j, 0))
+                          for j in sorted(old.keys() | new.keys()) if old.get(j, 0) != new.get(j, 0)]
+        self.__trace.record(step, next_step, self.__shifts[0], self.__shifts[1], marks,
+                            [i for i in range(n) if row_covered[i] != self.__row_covered[i]],
+                            [j for j in range(n) if col_covered[j] != self.__col_covered[j]])
+        self.__shifts = None
+        return next_step
+
     @staticmethod
-    def __make_matrix(n, val):
-        matrix = []
-        for _ in range(n):
-            matrix += [[val for _ in range(n)]]
-        return matrix
+    def __row_marks(star, prime):
+        # the marks of one row as column -> 1 (star) / 2 (prime)
+        marks = {}
+        if star >= 0:
+            marks[star] = 1
+        if prime >= 0:
+            marks[prime] = 2
+        return marks
 
     def __step1(self):
         n = self.__n
@@ -102,22 +198,34 @@ class Munkres:
             minval = min(self.__C[i])
             for j in range(n):
                 self.__C[i][j] -= minval
+            if self.__shifts is not None and minval:
+                self.__shifts[0].append((i, -minval))
 
+        col_mins = [min(col) for col in zip(*self.__C)]
         for i in range(n):
-            minval = min(list(zip(*self.__C))[i])
+            minval = col_mins[i]
             for j in range(n):
                 self.__C[j][i] -= minval
+            if self.__shifts is not None and minval:
+                self.__shifts[1].append((i, -minval))
+
+        # a zero is exact, also for floats: x - min(x...) is 0 for the minimum
+        # and never negative, and step 6 keeps it that way
+        for i in range(n):
+            row = self.__C[i]
+            self.__zeros[i] = [j for j in range(n) if row[j] <= 0]
+        self.__index_zero_rows()
 
         return 2
 
     def __step2(self):
         n = self.__n
         for i in range(n):
-            for j in range(n):
-                if (self.__C[i][j] == 0) and \
-                   (not self.__col_covered[j]) and \
+            for j in self.__zeros[i]:
+                if (not self.__col_covered[j]) and \
                    (not self.__row_covered[i]):
-                    self.__marked[i][j] = 1
+                    self.__star_in_row[i] = j
+                    self.__star_in_col[j] = i
                     self.__col_covered[j] = True
                     self.__row_covered[i] = True
 
@@ -127,11 +235,13 @@ class Munkres:
     def __step3(self):
         n = self.__n
         count = 0
-        for i in range(n):
-            for j in range(n):
-                if self.__marked[i][j] == 1:
-                    self.__col_covered[j] = True
-                    count += 1
+        for j in range(n):
+            if self.__star_in_col[j] >= 0:
+                self.__col_covered[j] = True
+                count += 1
+
+        if self.__progress is not None and self.__progress(count, n) is False:
+            self.__cancelled = True
 
         if count >= n:
             return 7
@@ -146,18 +256,25 @@ class Munkres:
         row = -1
         col = -1
         star_col = -1
+        # rows that may hold an uncovered zero, smallest first. A row only
+        # gains one when a column is uncovered, covered rows are dropped when
+        # they come up
+        self.__candidates = [i for i in range(self.__n) if self.__zeros[i] and not self.__row_covered[i]]
         while not done:
             (row, col) = self.__find_a_zero()
             if row < 0:
                 done = True
                 step = 6
             else:
-                self.__marked[row][col] = 2
+                self.__prime_in_row[row] = col
                 star_col = self.__find_star_in_row(row)
                 if star_col >= 0:
                     col = star_col
                     self.__row_covered[row] = True
                     self.__col_covered[col] = False
+                    for i in self.__zero_rows[col]:
+                        if not self.__row_covered[i]:
+                            heapq.heappush(self.__candidates, i)
                 else:
                     done = True
                     self.__z_r = row
@@ -168,26 +285,28 @@ class Munkres:
 
     def __step5(self):
         count = 0
-        path = self.__path
-        path[count][0] = self.__z_r
-        path[count][1] = self.__z_c
+        path_rows, path_cols = self.__path_rows, self.__path_cols
+        path_rows[count] = self.__z_r
+        path_cols[count] = self.__z_c
         done = False
         while not done:
-            row = self.__find_star_in_col(path[count][1])
+            row = self.__find_star_in_col(path_cols[count])
             if row >= 0:
                 count += 1
-                path[count][0] = row
-                path[count][1] = path[count-1][1]
+                path_rows[count] = row
+                path_cols[count] = path_cols[count-1]
             else:
                 done = True
 
             if not done:
-                col = self.__find_prime_in_row(path[count][0])
+                col = self.__find_prime_in_row(path_rows[count])
                 count += 1
-                path[count][0] = path[count-1][0]
-                path[count][1] = col
+                path_rows[count] = path_rows[count-1]
+                path_cols[count] = col
 
-        self.__convert_path(path, count)
+        if self.__hook is not None:
+            self.__hook.on_augment(count + 1)
+        self.__convert_path(count)
         self.__clear_covers()
         self.__erase_primes()
         return 3
@@ -200,74 +319,80 @@ class Munkres:
                     self.__C[i][j] += minval
                 if not self.__col_covered[j]:
                     self.__C[i][j] -= minval
+        if self.__shifts is not None:
+            # the whole update is two shifts, which is all the trace keeps
+            self.__shifts[0].extend((i, minval) for i in range(self.__n) if self.__row_covered[i])
+            self.__shifts[1].extend((j, -minval) for j in range(self.__n) if not self.__col_covered[j])
+
+        # covered rows lose the zeros of covered columns, uncovered rows gain
+        # the new zeros of uncovered columns (they had none there before)
+        uncovered_cols = [j for j in range(self.__n) if not self.__col_covered[j]]
+        for i in range(self.__n):
+            row = self.__C[i]
+            if self.__row_covered[i]:
+                self.__zeros[i] = [j for j in self.__zeros[i] if row[j] <= 0]
+            else:
+                new = [j for j in uncovered_cols if row[j] <= 0]
+                if new:
+                    self.__zeros[i] = sorted(self.__zeros[i] + new)
+        self.__index_zero_rows()
         return 4
 
     def __find_smallest(self):
-        minval = sys.maxsize
+        if self.__hook is not None:
+            self.__hook.on_scan('find_smallest')
+        minval = math.inf
         for i in range(self.__n):
             for j in range(self.__n):
                 if (not self.__row_covered[i]) and (not self.__col_covered[j]) and (minval > self.__C[i][j]):
                     minval = self.__C[i][j]
+        if minval == math.inf:
+            raise ValueError("every uncovered cost is infinite, there is no feasible assignment")
         return minval
 
     def __find_a_zero(self):
-        row = -1
-        col = -1
-        i = 0
-        n = self.__n
-        done = False
-
-        while not done:
-            j = 0
-            while True:
-                if (self.__C[i][j] == 0) and \
-                   (not self.__row_covered[i]) and \
-                   (not self.__col_covered[j]):
-                    row = i
-                    col = j
-                    done = True
-                j += 1
-                if j >= n:
-                    break
-            i += 1
-            if i >= n:
-                done = True
-
-        return row, col
-
-    def __find_star_in_row(self, row):
-        col = -1
+        # the first row holding an uncovered zero and the last uncovered zero
+        # in it, as the full scan this index replaces picked them
+        if self.__hook is not None:
+            self.__hook.on_lookup('find_a_zero')
+        candidates = self.__candidates
+        while candidates:
+            i = candidates[0]
+            if not self.__row_covered[i]:
+                for j in reversed(self.__zeros[i]):
+                    if not self.__col_covered[j]:
+                        return i, j
+            heapq.heappop(candidates)
+
+        return -1, -1
+
+    def __index_zero_rows(self):
+        zero_rows = self.__zero_rows
         for j in range(self.__n):
-            if self.__marked[row][j] == 1:
-                col = j
-                break
+            zero_rows[j] = []
+        for i, cols in enumerate(self.__zeros):
+            for j in cols:
+                zero_rows[j].append(i)
 
-        return col
+    def __find_star_in_row(self, row):
+        return self.__star_in_row[row]
 
     def __find_star_in_col(self, col):
-        row = -1
-        for i in range(self.__n):
-            if self.__marked[i][col] == 1:
-                row = i
-                break
-
-        return row
+        return self.__star_in_col[col]
 
     def __find_prime_in_row(self, row):
-        col = -1
-        for j in range(self.__n):
-            if self.__marked[row][j] == 2:
-                col = j
-                break
-
-        return col
-
-    def __convert_path(self, path, count):
-        for i in range(count+1):
-            if self.__marked[path[i][0]][path[i][1]] == 1:
-                self.__marked[path[i][0]][path[i][1]] = 0
-            else:
-                self.__marked[path[i][0]][path[i][1]] = 1
+        return self.__prime_in_row[row]
+
+    def __convert_path(self, count):
+        # the odd cells of the path are stars and lose them, the even ones are
+        # primes and become the new stars
+        path_rows, path_cols = self.__path_rows, self.__path_cols
+        for k in range(1, count+1, 2):
+            self.__star_in_row[path_rows[k]] = -1
+            self.__star_in_col[path_cols[k]] = -1
+        for k in range(0, count+1, 2):
+            self.__star_in_row[path_rows[k]] = path_cols[k]
+            self.__star_in_col[path_cols[k]] = path_rows[k]
 
     def __clear_covers(self):
         for i in range(self.__n):
@@ -276,6 +401,4 @@ class Munkres:
 
     def __erase_primes(self):
         for i in range(self.__n):
-            for j in range(self.__n):
-                if self.__marked[i][j] == 2:
-                    self.__marked[i][j] = 0
+            self.__prime_in_row[i] = -1
@@ -0,0 +1,220 @@
+import logging
+
+from costs import FLOAT64, FORBIDDEN, INT64, cost_kind
+from sparse import check_feasible
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, see engines.make_engine
+    np = None
+
+
+class NumpyMunkres:
+
+    def __init__(self):
+        if np is None:
+            raise ImportError("NumpyMunkres requires numpy")
+
+        self.__C = None
+        self.__forbidden = False
+        self.__row_covered = None
+        self.__col_covered = None
+        self.__n = 0
+        self.__original_length = 0
+        self.__original_width = 0
+        self.__z_r = 0
+        self.__z_c = 0
+        self.__marked = None
+        self.__path = None
+        self.__progress = None
+        self.__cancelled = False
+
+    def setup(self, cost_matrix):
+        # the steps reduce a contiguous copy, the caller's matrix is only read.
+        # int64 and float64 costs get typed arrays, anything else an object
+        # array. Zeros are exact: step 6 clamps round-off below 0 back to 0
+        kind = cost_kind(cost_matrix)
+        self.__C = np.array(cost_matrix, dtype={INT64: np.int64, FLOAT64: np.float64}.get(kind, object))
+        self.__forbidden = kind != INT64 and bool((self.__C == FORBIDDEN).any())
+        self.__n = self.__C.shape[0]
+        self.__original_length, self.__original_width = self.__C.shape
+        self.__row_covered = np.zeros(self.__n, dtype=bool)
+        self.__col_covered = np.zeros(self.__n, dtype=bool)
+        self.__z_r = 0
+        self.__z_c = 0
+        self.__path = np.zeros((self.__n * 2, 2), dtype=np.intp)
+        self.__marked = np.zeros((self.__n, self.__n), dtype=np.int8)
+        self.__cancelled = False
+
+    def set_progress(self, callback):
+        # same contract as Munkres.set_progress
+        self.__progress = callback
+
+    def is_cancelled(self):
+        return self.__cancelled
+
+    def get_col_covered(self):
+        return self.__col_covered
+
+    def get_row_covered(self):
+        return self.__row_covered
+
+    def get_marked(self):
+        marked = self.__marked[:self.__original_length, :self.__original_width]
+        return [(int(i), int(j)) for i, j in np.argwhere(marked == 1)]
+
+    def solve_all(self):
+        if self.__forbidden:
+            check_feasible(self.__C)
+
+        done = False
+        step = 1
+
+        steps = {1: self.__step1,
+                 2: self.__step2,
+                 3: self.__step3,
+                 4: self.__step4,
+                 5: self.__step5,
+                 6: self.__step6}
+
+        while not done:
+            try:
+                if step == 7 or self.__cancelled:
+                    break
+                func = steps[step]
+                step = func()
+            except KeyError:
+                print("the key is invalid")
+                done = True
+            except Exception as e:
+                print("unexpected error")
+                logging.exception(e)
+                done = True
+
+    def solve_step(self, step):
+
+        steps = {1: self.__step1,
+                 2: self.__step2,
+                 3: self.__step3,
+                 4: self.__step4,
+                 5: self.__step5,
+                 6: self.__step6}
+
+        try:
+            if step == 7:
+                return
+            func = steps[step]
+            step = func()
+            return step
+        except KeyError:
+            print("the key is invalid")
+        except Exception as e:
+            print("unexpected error")
+            logging.exception(e)
+
+    def __step1(self):
+        C = self.__C
+        C -= C.min(axis=1)[:, np.newaxis]
+        C -= C.min(axis=0)[np.newaxis, :]
+        return 2
+
+    def __step2(self):
+        zeros = self.__C <= 0
+        for i in range(self.__n):
+            cols = np.flatnonzero(zeros[i] & ~self.__col_covered)
+            if cols.size:
+                self.__marked[i, cols[0]] = 1
+                self.__col_covered[cols[0]] = True
+
+        self.__clear_covers()
+        return 3
+
+    def __step3(self):
+        self.__col_covered[:] = (self.__marked == 1).any(axis=0)
+        count = np.count_nonzero(self.__col_covered)
+        if self.__progress is not None and self.__progress(int(count), self.__n) is False:
+            self.__cancelled = True
+
+        if count >= self.__n:
+            return 7
+        return 4
+
+    def __step4(self):
+        while True:
+            (row, col) = self.__find_a_zero()
+            if row < 0:
+                return 6
+
+            self.__marked[row, col] = 2
+            star_col = self.__find_star_in_row(row)
+            if star_col >= 0:
+                self.__row_covered[row] = True
+                self.__col_covered[star_col] = False
+            else:
+                self.__z_r = row
+                self.__z_c = col
+                return 5
+
+    def __step5(self):
+        count = 0
+        path = self.__path
+        path[count, 0] = self.__z_r
+        path[count, 1] = self.__z_c
+        while True:
+            row = self.__find_star_in_col(path[count, 1])
+            if row < 0:
+                break
+            count += 1
+            path[count, 0] = row
+            path[count, 1] = path[count - 1, 1]
+
+            col = self.__find_prime_in_row(path[count, 0])
+            count += 1
+            path[count, 0] = path[count - 1, 0]
+            path[count, 1] = col
+
+        rows, cols = path[:count + 1, 0], path[:count + 1, 1]
+        self.__marked[rows, cols] = np.where(self.__marked[rows, cols] == 1, 0, 1)
+        self.__clear_covers()
+        self.__marked[self.__marked == 2] = 0
+        return 3
+
+    def __step6(self):
+        uncovered_rows = ~self.__row_covered
+        uncovered_cols = ~self.__col_covered
+        minval = self.__C[uncovered_rows][:, uncovered_cols].min()
+        if minval == np.inf:
+            raise ValueError("every uncovered cost is infinite, there is no feasible assignment")
+        self.__C[self.__row_covered] += minval
+        self.__C[:, uncovered_cols] -= minval
+        np.maximum(self.__C, 0, out=self.__C)
+        return 4
+
+    def __find_a_zero(self):
+        # same pick as Munkres: first row holding an uncovered zero, last such
+        # zero in that row
+        uncovered_rows = np.flatnonzero(~self.__row_covered)
+        uncovered_cols = np.flatnonzero(~self.__col_covered)
+        zeros = self.__C[np.ix_(uncovered_rows, uncovered_cols)] <= 0
+        rows = np.flatnonzero(zeros.any(axis=1))
+        if not rows.size:
+            return -1, -1
+
+        cols = np.flatnonzero(zeros[rows[0]])
+        return int(uncovered_rows[rows[0]]), int(uncovered_cols[cols[-1]])
+
+    def __find_star_in_row(self, row):
+        cols = np.flatnonzero(self.__marked[row] == 1)
+        return int(cols[0]) if cols.size else -1
+
+    def __find_star_in_col(self, col):
+        rows = np.flatnonzero(self.__marked[:, col] == 1)
+        return int(rows[0]) if rows.size else -1
+
+    def __find_prime_in_row(self, row):
+        cols = np.flatnonzero(self.__marked[row] == 2)
+        return int(cols[0]) if cols.size else -1
+
+    def __clear_covers(self):
+        self.__row_covered[:] = False
+        self.__col_covered[:] = False
@@ -0,0 +1,127 @@
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from engines import make_engine
+from munkres_numpy import np
+
+
+def _solve_chunk(shm_name, dtype, length, engine_name, problems):
+    # runs in a worker process: the matrices are read straight out of the
+    # shared block, only (offset, size) pairs and the resulting columns are
+    # pickled
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        data = np.ndarray((length,), dtype=dtype, buffer=shm.buf)
+        matrices = [data[offset:offset + n * n].reshape(n, n).tolist() for offset, n in problems]
+        del data
+    finally:
+        shm.close()
+
+    engine = make_engine(engine_name)
+    results = []
+    for matrix in matrices:
+        engine.setup(matrix)
+        engine.solve_all()
+
+        cols = [-1] * len(matrix)
+        for row, col in engine.get_marked():
+            cols[row] = col
+        results += [cols]
+
+    return results
+
+
+class ParallelSolver:
+
+    def __init__(self, workers=None, chunksize=64, engine='munkres'):
+        if np is None:
+            raise ImportError("ParallelSolver requires numpy")
+        if chunksize < 1:
+            raise ValueError("chunksize must be at least 1")
+
+        self.__workers = workers
+        self.__chunksize = chunksize
+        self.__engine = engine
+        self.__executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
+
+    def solve(self, matrices):
+        # same results as batch.solve_batch, in input order
+        stacked = isinstance(matrices, np.ndarray)
+        if stacked:
+            if matrices.ndim != 3 or matrices.shape[1] != matrices.shape[2]:
+                raise ValueError("expected a stack of square matrices, got shape %s" % (matrices.shape,))
+            arrays = matrices
+        else:
+            arrays = [np.asarray(matrix) for matrix in matrices]
+            for matrix in arrays:
+                if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+                    raise ValueError("expected a square matrix, got shape %s" % (matrix.shape,))
+
+        if not len(arrays):
+            return (np.empty((0, 0), dtype=np.intp), np.empty(0)) if stacked else ([], [])
+
+        columns = self.__run(arrays)
+
+        if stacked:
+            assignments = np.array(columns, dtype=np.intp).reshape(matrices.shape[:2])
+            costs = np.take_along_axis(matrices, assignments[:, :, np.newaxis], axis=2).sum(axis=(1, 2))
+            return assignments, costs
+
+        assignments = [array('l', cols) for cols in columns]
+        costs = [matrix[np.arange(len(cols)), cols].sum().item() for matrix, cols in zip(arrays, columns)]
+        return assignments, costs
+
+    def __run(self, arrays):
+        dtype = np.result_type(*{matrix.dtype for matrix in arrays}) if isinstance(arrays, list) else arrays.dtype
+        if dtype.kind not in 'biuf':
+            # an object array holds pointers, they mean nothing in another process
+            raise ValueError("ParallelSolver needs numeric costs, got dtype %s; use batch.solve_batch for "
+                             "python number costs" % dtype)
+        if self.__executor is None:
+            self.__executor = ProcessPoolExecutor(max_workers=self.__workers)
+
+        problems = []
+        length = 0
+        for matrix in arrays:
+            problems += [(length, matrix.shape[0])]
+            length += matrix.size
+
+        shm = shared_memory.SharedMemory(create=True, size=max(1, length * dtype.itemsize))
+        try:
+            data = np.ndarray((length,), dtype=dtype, buffer=shm.buf)
+            if isinstance(arrays, list):
+                for (offset, n), matrix in zip(problems, arrays):
+                    data[offset:offset + n * n] = matrix.ravel()
+            else:
+                data[:] = arrays.ravel()
+            del data
+
+            futures = [self.__executor.submit(_solve_chunk, shm.name, dtype.str, length, self.__engine,
+                                              problems[k:k + self.__chunksize])
+                       for k in range(0, len(problems), self.__chunksize)]
+
+            columns = []
+            for future in futures:
+                columns += future.result()
+        finally:
+            shm.close()
+            shm.unlink()
+
+        return columns
+
+
+def solve_parallel(matrices, workers=None, chunksize=64, engine='munkres'):
+    with ParallelSolver(workers, chunksize, engine) as solver:
+        return solver.solve(matrices)
@@ -0,0 +1,369 @@
+import asyncio
+import collections
+import json
+import logging
+import math
+import os
+import stat
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import solve_batch
+from cache import fingerprint
+from costs import check_cost, parse_cost
+from engines import ENGINES
+from solver import solve
+from sparse import InfeasibleError
+
+# one JSON object per line in both directions, over a unix socket or TCP:
+#   {"id": 1, "matrix": [[4, 1], [2, "x"]], "engine": "lapjv", "timeout": 2.5}
+#   -> {"id": 1, "assignment": [[0, 1], [1, 0]], "total_cost": 3}
+#   -> {"id": 1, "error": "...", "kind": "infeasible|overloaded|timeout|invalid|failed"}
+#   {"id": 2, "metrics": true} -> {"id": 2, "metrics": {...}}
+# "id" is echoed back untouched, requests on one connection may be answered
+# out of order
+LINE_LIMIT = 64 * 1024 * 1024
+
+
+class Overloaded(RuntimeError):
+    pass
+
+
+class ServiceMetrics:
+
+    def __init__(self, window=10000):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.cache_hits = 0
+        self.batches = 0
+        self.batched = 0
+        self.pooled = 0
+        self.latencies = collections.deque(maxlen=window)
+
+    def as_dict(self):
+        uptime = time.monotonic() - self.started
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        return {'requests': self.requests,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'cache_hits': self.cache_hits,
+                'batches': self.batches,
+                'batched': self.batched,
+                'average_batch': self.batched / self.batches if self.batches else 0.0,
+                'pooled': self.pooled,
+                'latency_p50': percentile(0.50),
+                'latency_p95': percentile(0.95),
+                'latency_p99': percentile(0.99),
+                'throughput': self.completed / uptime if uptime else 0.0,
+                'uptime': uptime}
+
+
+def _solve_group(matrices, engine):
+    # one micro-batch of same-shape problems. Square LapJV problems go through
+    # batch.solve_batch (one solver and its buffers for the whole group), a
+    # group that fails is solved one by one so only the bad request fails
+    if engine == 'lapjv' and len(matrices[0]) == len(matrices[0][0]):
+        try:
+            assignments, costs = solve_batch(matrices)
+            return [([(i, j) for i, j in enumerate(cols) if j >= 0], total_cost)
+                    for cols, total_cost in zip(assignments, costs)]
+        except Exception:
+            pass
+
+    results = []
+    for matrix in matrices:
+        try:
+            results += [solve(matrix, engine)]
+        except Exception as e:
+            results += [e]
+    return results
+
+
+class SolveService:
+    # queues solve requests for many producers. Problems smaller than
+    # small_size wait up to batch_delay seconds for others of the same shape
+    # and engine and are solved together (up to batch_size per group) on a
+    # thread, bigger ones go to a process pool (a thread when workers is 0).
+    # More than max_pending requests in flight are rejected with Overloaded,
+    # every request has a timeout. An optional cache.SolutionCache answers
+    # repeated matrices without queueing them
+
+    def __init__(self, engine='lapjv', batch_size=32, batch_delay=0.002, small_size=64, workers=None,
+                 max_pending=1024, timeout=30.0, cache=None):
+        if engine not in ENGINES:
+            raise ValueError("unknown engine %r" % engine)
+
+        self.__engine = engine
+        self.__batch_size = batch_size
+        self.__batch_delay = batch_delay
+        self.__small_size = small_size
+        self.__workers = workers
+        self.__max_pending = max_pending
+        self.__timeout = timeout
+        self.__cache = cache
+
+        self.__loop = None
+        self.__pool = None
+        self.__queues = {}
+        self.__wakeup = None
+        self.__batcher = None
+        self.__pending = 0
+        self.metrics = ServiceMetrics()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def start(self):
+        self.__loop = asyncio.get_running_loop()
+        if self.__workers != 0:
+            self.__pool = ProcessPoolExecutor(max_workers=self.__workers)
+        self.__wakeup = asyncio.Event()
+        self.__batcher = self.__loop.create_task(self.__run_batches())
+
+    async def close(self):
+        if self.__batcher is not None:
+            self.__batcher.cancel()
+            try:
+                await self.__batcher
+            except asyncio.CancelledError:
+                pass
+            self.__batcher = None
+        if self.__pool is not None:
+            self.__pool.shutdown()
+            self.__pool = None
+
+    @property
+    def pending(self):
+        return self.__pending
+
+    async def submit(self, matrix, engine=None, timeout=None):
+        # returns (assignment, total_cost); raises Overloaded,
+        # asyncio.TimeoutError, InfeasibleError or whatever the solver raised
+        engine = engine or self.__engine
+        if engine not in ENGINES:
+            raise ValueError("unknown engine %r" % engine)
+
+        self.metrics.requests += 1
+        if self.__pending >= self.__max_pending:
+            self.metrics.rejected += 1
+            raise Overloaded("%d requests are already pending" % self.__pending)
+
+        start = time.perf_counter()
+        self.__pending += 1
+        try:
+            result = await asyncio.wait_for(self.__dispatch(matrix, engine),
+                                            timeout if timeout is not None else self.__timeout)
+        except asyncio.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        except Exception:
+            self.metrics.failed += 1
+            raise
+        finally:
+            self.__pending -= 1
+
+        self.metrics.completed += 1
+        self.metrics.latencies.append(time.perf_counter() - start)
+        return result
+
+    async def handle(self, request):
+        # one decoded request line to one response object
+        response = {'id': request.get('id')}
+        if request.get('metrics'):
+            response['metrics'] = self.metrics.as_dict()
+            return response
+
+        try:
+            matrix = _parse_matrix(request.get('matrix'))
+            engine, timeout = _parse_options(request)
+            marked, total_cost = await self.submit(matrix, engine, timeout)
+        except Overloaded as e:
+            response.update(error=str(e), kind='overloaded')
+        except asyncio.TimeoutError:
+            response.update(error="the request timed out", kind='timeout')
+        except InfeasibleError as e:
+            response.update(error=str(e), kind='infeasible')
+        except ValueError as e:
+            response.update(error=str(e), kind='invalid')
+        except Exception as e:
+            logging.exception(e)
+            response.update(error=str(e), kind='failed')
+        else:
+            response.update(assignment=[[i, j] for i, j in marked], total_cost=total_cost)
+        return response
+
+    async def __dispatch(self, matrix, engine):
+        key = None
+        if self.__cache is not None:
+            key = fingerprint(matrix, engine, 0)
+            cached = self.__cache.get(key)
+            if cached is not None:
+                self.metrics.cache_hits += 1
+                return cached
+
+        if max(len(matrix), len(matrix[0])) >= self.__small_size:
+            self.metrics.pooled += 1
+            result = await self.__loop.run_in_executor(self.__pool, solve, matrix, engine)
+        else:
+            future = self.__loop.create_future()
+            self.__queues.setdefault((len(matrix), len(matrix[0]), engine), []).append((matrix, future))
+            self.__wakeup.set()
+            result = await future
+
+        if key is not None:
+            self.__cache.put(key, *result)
+        return result
+
+    async def __run_batches(self):
+        while True:
+            await self.__wakeup.wait()
+            self.__wakeup.clear()
+            # give requests of the same shape a moment to join the batch
+            await asyncio.sleep(self.__batch_delay)
+            queues, self.__queues = self.__queues, {}
+
+            for (_, _, engine), jobs in queues.items():
+                # requests that timed out while queued are dropped
+                jobs = [(matrix, future) for matrix, future in jobs if not future.done()]
+                for k in range(0, len(jobs), self.__batch_size):
+                    group = jobs[k:k + self.__batch_size]
+                    self.metrics.batches += 1
+                    self.metrics.batched += len(group)
+                    try:
+                        results = await self.__loop.run_in_executor(None, _solve_group,
+                                                                    [matrix for matrix, _ in group], engine)
+                    except Exception as e:
+                        results = [e] * len(group)
+
+                    for (_, future), result in zip(group, results):
+                        if future.done():
+                            continue
+                        if isinstance(result, Exception):
+                            future.set_exception(result)
+                        else:
+                            future.set_result(result)
+
+    async def serve_connection(self, reader, writer):
+        tasks = set()
+
+        async def answer(line):
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("a request must be a JSON object")
+            except ValueError as e:
+                response = {'id': None, 'error': str(e), 'kind': 'invalid'}
+            else:
+                response = await self.handle(request)
+            writer.write(json.dumps(response).encode() + b'\n')
+            await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = self.__loop.create_task(answer(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def listen(self, path=None, host='127.0.0.1', port=8765):
+        # a unix socket at path, or TCP on host:port
+        if path is not None:
+            # a socket left by an earlier run is replaced, anything else at
+            # that path is not ours to delete
+            if os.path.lexists(path):
+                if not stat.S_ISSOCK(os.lstat(path).st_mode):
+                    raise FileExistsError("%s exists and is not a socket" % path)
+                os.unlink(path)
+            return await asyncio.start_unix_server(self.serve_connection, path=path, limit=LINE_LIMIT)
+        return await asyncio.start_server(self.serve_connection, host, port, limit=LINE_LIMIT)
+
+
+def _parse_matrix(matrix):
+    if not isinstance(matrix, list) or not matrix or not all(isinstance(row, list) and row for row in matrix):
+        raise ValueError("matrix must be a non-empty list of non-empty rows")
+    if len(set(map(len, matrix))) != 1:
+        raise ValueError("all rows of the matrix must have the same length")
+    # forbidden pairs may be sent as "x", JSON has no infinity
+    return [[_parse_cost(cost) for cost in row] for row in matrix]
+
+
+def _parse_cost(cost):
+    # json.loads takes NaN and -Infinity too, they would never be solved
+    if isinstance(cost, str):
+        return parse_cost(cost)
+    if isinstance(cost, bool) or not isinstance(cost, (int, float)):
+        raise ValueError("a cost must be a number or \"x\", got %s" % json.dumps(cost))
+    return check_cost(cost)
+
+
+def _parse_options(request):
+    engine = request.get('engine')
+    if engine is not None and not isinstance(engine, str):
+        raise ValueError("engine must be a string, got %s" % json.dumps(engine))
+    timeout = request.get('timeout')
+    if timeout is not None:
+        if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or not 0 < timeout < math.inf:
+            raise ValueError("timeout must be a positive number of seconds, got %s" % json.dumps(timeout))
+    return engine, timeout
+
+
+class LoopbackClient:
+    # stands in for a socket connection in tests and in-process producers:
+    # requests take the same JSON round trip and the same handler
+
+    def __init__(self, service):
+        self.__service = service
+
+    async def request(self, payload):
+        response = await self.__service.handle(json.loads(json.dumps(payload)))
+        return json.loads(json.dumps(response))
+
+
+class ServiceClient:
+
+    def __init__(self, reader, writer):
+        self.__reader = reader
+        self.__writer = writer
+        self.__lock = asyncio.Lock()
+
+    @classmethod
+    async def connect(cls, path=None, host='127.0.0.1', port=8765):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path, limit=LINE_LIMIT)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+        return cls(reader, writer)
+
+    async def request(self, payload):
+        # one request at a time per client, open more clients to pipeline
+        async with self.__lock:
+            self.__writer.write(json.dumps(payload).encode() + b'\n')
+            await self.__writer.drain()
+            return json.loads(await self.__reader.readline())
+
+    async def close(self):
+        self.__writer.close()
+        await self.__writer.wait_closed()
@@ -0,0 +1,63 @@
+from engines import RECTANGULAR, make_engine
+from loader import to_lists
+
+
+def solve(matrix, engine='lapjv', pad_value=0, hook=None, threads=None):
+    # headless entry point: solves a list of lists, an ndarray or typed rows
+    # without touching the caller's matrix. Engines in RECTANGULAR take an
+    # n x m matrix as it is, for the others it is padded to a square with
+    # pad_value; the padding never shows up in the result. hook is handed to
+    # the engines that can be instrumented, see stats.SolveStats. threads
+    # sets the worker count of the engines that split a solve over threads
+    costs = to_lists(matrix)
+    rows = len(costs)
+    cols = max(map(len, costs), default=0)
+    if not rows or not cols:
+        return [], 0
+
+    if engine in RECTANGULAR:
+        height, width = rows, cols
+    else:
+        height = width = max(rows, cols)
+    for row in costs:
+        row += [pad_value] * (width - len(row))
+    costs += [[pad_value] * width for _ in range(height - rows)]
+
+    solver = make_engine(engine)
+    if hook is not None and hasattr(solver, 'set_hook'):
+        solver.set_hook(hook)
+    if threads is not None and hasattr(solver, 'set_workers'):
+        solver.set_workers(threads)
+    try:
+        solver.setup(costs)
+        solver.solve_all()
+    finally:
+        if hasattr(solver, 'close'):
+            solver.close()
+
+    marked = [(i, j) for i, j in solver.get_marked() if i < rows and j < len(matrix[i])]
+    total_cost = sum(matrix[i][j] for i, j in marked)
+    if hasattr(total_cost, 'item'):
+        total_cost = total_cost.item()
+
+    return marked, total_cost
+
+
+def solve_within(matrix, seconds=None, epsilon=None):
+    # anytime counterpart of solve(): the best assignment the auction engine
+    # found within `seconds` (or down to `epsilon`), with a lower bound on the
+    # optimal total cost. total_cost - lower_bound is how far from the
+    # optimum the assignment may be, 0 once it is proven optimal
+    if not len(matrix) or not len(matrix[0]):
+        return [], 0, 0
+    solver = make_engine('auction')
+    solver.set_budget(seconds, epsilon)
+    solver.setup(matrix)
+    solver.solve_all()
+
+    marked = solver.get_marked()
+    total_cost = sum(matrix[i][j] for i, j in marked)
+    lower_bound = solver.get_lower_bound()
+    if hasattr(total_cost, 'item'):
+        total_cost = total_cost.item()
+    return marked, total_cost, min(lower_bound, total_cost)
@@ -0,0 +1,374 @@
+import heapq
+import math
+from array import array
+from bisect import bisect_left
+
+from costs import cost_kind
+
+
+class InfeasibleError(ValueError):
+
+    def __init__(self, row, msg=None):
+        super().__init__(msg or "no perfect matching exists, row %d cannot be assigned" % row)
+        self.row = row
+
+
+def hopcroft_karp(adjacency, n_cols):
+    # maximum bipartite matching: adjacency[i] lists the columns row i may
+    # take. Returns the matched column of every row (-1 when unmatched) in
+    # O(E sqrt(V)), augmenting paths are searched without recursion
+    n_rows = len(adjacency)
+    col4row = [-1] * n_rows
+    row4col = [-1] * n_cols
+
+    # greedy start, most rows are matched before the first phase
+    for i, cols in enumerate(adjacency):
+        for j in cols:
+            if row4col[j] < 0:
+                row4col[j] = i
+                col4row[i] = j
+                break
+
+    while True:
+        dist = [math.inf] * n_rows
+        queue = [i for i in range(n_rows) if col4row[i] < 0]
+        for i in queue:
+            dist[i] = 0
+        found = False
+        head = 0
+        while head < len(queue):
+            i = queue[head]
+            head += 1
+            for j in adjacency[i]:
+                k = row4col[j]
+                if k < 0:
+                    found = True
+                elif dist[k] == math.inf:
+                    dist[k] = dist[i] + 1
+                    queue.append(k)
+        if not found:
+            return col4row
+
+        for root in range(n_rows):
+            if col4row[root] >= 0:
+                continue
+            # stack of rows along the layered graph and the columns between them
+            stack = [(root, iter(adjacency[root]))]
+            cols = []
+            while stack:
+                i, neighbours = stack[-1]
+                for j in neighbours:
+                    k = row4col[j]
+                    if k < 0:
+                        cols.append(j)
+                        for (r, _), c in zip(stack, cols):
+                            col4row[r] = c
+                            row4col[c] = r
+                        stack = []
+                        break
+                    if dist[k] == dist[i] + 1:
+                        cols.append(j)
+                        stack.append((k, iter(adjacency[k])))
+                        break
+                else:
+                    dist[i] = math.inf
+                    stack.pop()
+                    if cols:
+                        cols.pop()
+
+
+def check_feasible(matrix, forbidden=math.inf):
+    # fails fast before a solve: every row of the smaller side needs a
+    # distinct partner over the pairs that are not forbidden, else
+    # InfeasibleError names a row (or column) that cannot be assigned
+    if hasattr(matrix, 'dtype'):
+        adjacency = [row.nonzero()[0].tolist() for row in matrix != forbidden]
+    else:
+        adjacency = [[j for j, cost in enumerate(row) if cost != forbidden] for row in matrix]
+
+    n_rows = len(adjacency)
+    n_cols = len(matrix[0]) if n_rows else 0
+    side = 'row'
+    if n_rows > n_cols:
+        transposed = [[] for _ in range(n_cols)]
+        for i, cols in enumerate(adjacency):
+            for j in cols:
+                transposed[j].append(i)
+        adjacency, n_rows, n_cols, side = transposed, n_cols, n_rows, 'column'
+
+    for i, cols in enumerate(adjacency):
+        if not cols:
+            raise InfeasibleError(i, "%s %d has no allowed partner" % (side, i))
+    if n_rows == n_cols:
+        reached = set()
+        for cols in adjacency:
+            reached.update(cols)
+        if len(reached) < n_cols:
+            j = min(set(range(n_cols)) - reached)
+            raise InfeasibleError(j, "column %d has no allowed partner" % j)
+
+    col4row = hopcroft_karp(adjacency, n_cols)
+    if -1 in col4row:
+        i = col4row.index(-1)
+        raise InfeasibleError(i, "no complete assignment exists, %s %d cannot be assigned" % (side, i))
+
+
+class SparseCostMatrix:
+    # compressed sparse rows: the columns allowed for row i are
+    # indices[indptr[i]:indptr[i + 1]] (sorted) with costs at the same
+    # positions in data, every other pair is forbidden
+
+    def __init__(self, n_rows, n_cols, indptr, indices, data):
+        if len(indptr) != n_rows + 1:
+            raise ValueError("indptr must hold n_rows + 1 entries")
+        if len(indices) != len(data) or indptr[-1] != len(indices):
+            raise ValueError("indices and data must hold indptr[-1] entries")
+        # NaN and -inf costs are rejected here, the search would never end
+        cost_kind(data if hasattr(data, 'dtype') else [data])
+
+        self.__n_rows = n_rows
+        self.__n_cols = n_cols
+        self.__indptr = indptr
+        self.__indices = indices
+        self.__data = data
+
+    @classmethod
+    def from_edges(cls, edges, n_rows=None, n_cols=None):
+        # edges is an iterable of (row, col, cost), a repeated pair keeps its
+        # lowest cost
+        rows = {}
+        for row, col, cost in edges:
+            cols = rows.setdefault(row, {})
+            if col not in cols or cost < cols[col]:
+                cols[col] = cost
+
+        if n_rows is None:
+            n_rows = max(rows, default=-1) + 1
+        if n_cols is None:
+            n_cols = max((max(cols) for cols in rows.values()), default=-1) + 1
+
+        typecode = 'q'
+        for cols in rows.values():
+            if any(isinstance(cost, float) for cost in cols.values()):
+                typecode = 'd'
+                break
+
+        indptr = array('q', [0])
+        indices = array('l')
+        data = array(typecode)
+        for i in range(n_rows):
+            cols = rows.pop(i, {})
+            for j in sorted(cols):
+                if not 0 <= j < n_cols:
+                    raise ValueError("column %d is out of range for row %d" % (j, i))
+                indices.append(j)
+                data.append(cols[j])
+            indptr.append(len(indices))
+
+        if rows:
+            raise ValueError("row %d is out of range" % min(rows))
+
+        return cls(n_rows, n_cols, indptr, indices, data)
+
+    @classmethod
+    def from_dense(cls, matrix, forbidden=math.inf):
+        # empty (None) cells and cells equal to forbidden are left out
+        return cls.from_edges(((i, j, cost)
+                               for i, row in enumerate(matrix)
+                               for j, cost in enumerate(row)
+                               if cost is not None and cost != forbidden),
+                              len(matrix), len(matrix[0]) if matrix else 0)
+
+    @property
+    def shape(self):
+        return self.__n_rows, self.__n_cols
+
+    @property
+    def nnz(self):
+        return len(self.__indices)
+
+    def row(self, i):
+        start, end = self.__indptr[i], self.__indptr[i + 1]
+        return self.__indices[start:end], self.__data[start:end]
+
+    def get(self, row, col, default=None):
+        start, end = self.__indptr[row], self.__indptr[row + 1]
+        k = bisect_left(self.__indices, col, start, end)
+        if k < end and self.__indices[k] == col:
+            return self.__data[k]
+        return default
+
+    def csr(self):
+        return self.__indptr, self.__indices, self.__data
+
+
+class SparseLapJV:
+
+    def __init__(self):
+        self.__C = None
+        self.__n_rows = 0
+        self.__n_cols = 0
+        self.__u = []
+        self.__v = []
+        self.__col4row = []
+        self.__row4col = []
+
+    def setup(self, cost_matrix):
+        self.__C = cost_matrix
+        self.__n_rows, self.__n_cols = cost_matrix.shape
+        if self.__n_rows > self.__n_cols:
+            raise InfeasibleError(self.__n_cols, "%d rows cannot be assigned to %d columns"
+                                  % (self.__n_rows, self.__n_cols))
+
+        self.__u = [0] * self.__n_rows
+        self.__v = [0] * self.__n_cols
+        self.__col4row = [-1] * self.__n_rows
+        self.__row4col = [-1] * self.__n_cols
+
+    def get_marked(self):
+        return [(i, j) for i, j in enumerate(self.__col4row) if j >= 0]
+
+    def get_assignment(self):
+        return self.__col4row
+
+    def get_potentials(self):
+        return self.__u, self.__v
+
+    def get_total_cost(self):
+        return sum(self.__C.get(i, j) for i, j in self.get_marked())
+
+    def solve_all(self):
+        indptr, indices, _ = self.__C.csr()
+        adjacency = [indices[indptr[i]:indptr[i + 1]] for i in range(self.__n_rows)]
+        matching = hopcroft_karp(adjacency, self.__n_cols)
+        if -1 in matching:
+            raise InfeasibleError(matching.index(-1))
+        self.__row_reduction()
+        free = [i for i in range(self.__n_rows) if self.__col4row[i] < 0]
+        for _ in range(2):
+            free = self.__augmenting_row_reduction(free)
+        for i in free:
+            self.__augment(i)
+
+    def __row_reduction(self):
+        # u[i] is the cheapest allowed cost of row i with v = 0, a row whose
+        # cheapest column is still free takes it right away
+        indptr, indices, data = self.__C.csr()
+        for i in range(self.__n_rows):
+            start, end = indptr[i], indptr[i + 1]
+            if start == end:
+                raise InfeasibleError(i, "row %d has no allowed column" % i)
+
+            k = min(range(start, end), key=data.__getitem__)
+            self.__u[i] = data[k]
+            j = indices[k]
+            if self.__row4col[j] < 0:
+                self.__row4col[j] = i
+                self.__col4row[i] = j
+
+    def __augmenting_row_reduction(self, free):
+        # auction-like pass of Jonker-Volgenant: a free row takes its cheapest
+        # column and lowers that column's price by the gap to its second
+        # cheapest, the row it displaces is retried at once; rows left over are
+        # returned for the Dijkstra augmentation
+        indptr, indices, data = self.__C.csr()
+        u, v = self.__u, self.__v
+        col4row, row4col = self.__col4row, self.__row4col
+
+        left = []
+        budget = 10 * self.__n_rows
+        k = 0
+        while k < len(free):
+            i = free[k]
+            k += 1
+
+            u1 = u2 = math.inf
+            j1 = j2 = -1
+            for e in range(indptr[i], indptr[i + 1]):
+                j = indices[e]
+                h = data[e] - v[j]
+                if h < u2:
+                    if h < u1:
+                        u2, j2 = u1, j1
+                        u1, j1 = h, j
+                    else:
+                        u2, j2 = h, j
+
+            i0 = row4col[j1]
+            lowered = u1 < u2 < math.inf
+            if lowered:
+                v[j1] -= u2 - u1
+            elif i0 >= 0 and j2 >= 0:
+                j1 = j2
+                i0 = row4col[j1]
+
+            row4col[j1] = i
+            col4row[i] = j1
+            u[i] = u2 if lowered else u1
+            if i0 >= 0:
+                col4row[i0] = -1
+                budget -= 1
+                if lowered and budget > 0:
+                    k -= 1
+                    free[k] = i0
+                else:
+                    left += [i0]
+
+        return left
+
+    def __augment(self, cur_row):
+        # Dijkstra with a heap over the allowed edges only, distances are kept
+        # for touched columns so an augmentation costs O(edges seen log edges)
+        indptr, indices, data = self.__C.csr()
+        u, v = self.__u, self.__v
+        col4row, row4col = self.__col4row, self.__row4col
+
+        shortest = {}
+        path = {}
+        final = {}
+        heap = []
+
+        u[cur_row] = min(data[k] - v[indices[k]] for k in range(indptr[cur_row], indptr[cur_row + 1]))
+
+        i, dist = cur_row, 0
+        sink = -1
+        while True:
+            ui = u[i]
+            for k in range(indptr[i], indptr[i + 1]):
+                j = indices[k]
+                if j in final:
+                    continue
+                r = dist + data[k] - ui - v[j]
+                if r < shortest.get(j, math.inf):
+                    shortest[j] = r
+                    path[j] = i
+                    # free columns first among equal distances
+                    heapq.heappush(heap, (r, row4col[j] >= 0, j))
+
+            while heap:
+                dist, _, j = heapq.heappop(heap)
+                if j not in final and dist == shortest[j]:
+                    break
+            else:
+                raise InfeasibleError(cur_row)
+
+            final[j] = dist
+            if row4col[j] < 0:
+                sink = j
+                break
+            i = row4col[j]
+
+        min_val = final[sink]
+        u[cur_row] += min_val
+        for j, dist in final.items():
+            if j != sink:
+                u[row4col[j]] += min_val - dist
+                v[j] -= min_val - dist
+
+        j = sink
+        while True:
+            i = path[j]
+            row4col[j] = i
+            col4row[i], j = j, col4row[i]
+            if i == cur_row:
+                break
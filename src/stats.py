@@ -0,0 +1,60 @@
+import json
+
+
+class SolveStats:
+    # a hook for Munkres.set_hook that counts what the step machine did:
+    # how often every step ran and how long it took, the full-matrix scans of
+    # __find_smallest, the zero index lookups of __find_a_zero and the
+    # augmenting paths of step 5. Any object with the same four on_* methods
+    # can be used as a hook
+
+    def __init__(self):
+        self.steps = {}
+        self.seconds = {}
+        self.scans = {}
+        self.lookups = {}
+        self.augmentations = 0
+        self.path_length = 0
+
+    def on_step(self, step, next_step, seconds):
+        self.steps[step] = self.steps.get(step, 0) + 1
+        self.seconds[step] = self.seconds.get(step, 0.0) + seconds
+
+    def on_scan(self, name):
+        self.scans[name] = self.scans.get(name, 0) + 1
+
+    def on_lookup(self, name):
+        self.lookups[name] = self.lookups.get(name, 0) + 1
+
+    def on_augment(self, length):
+        self.augmentations += 1
+        self.path_length += length
+
+    def total_seconds(self):
+        return sum(self.seconds.values())
+
+    def as_dict(self):
+        return {'steps': {str(step): count for step, count in sorted(self.steps.items())},
+                'seconds': {str(step): seconds for step, seconds in sorted(self.seconds.items())},
+                'scans': dict(sorted(self.scans.items())),
+                'lookups': dict(sorted(self.lookups.items())),
+                'augmentations': self.augmentations,
+                'path_length': self.path_length,
+                'total_seconds': self.total_seconds()}
+
+    def summary(self):
+        lines = ["step  runs     seconds"]
+        for step in sorted(self.steps):
+            lines += ["%4d %5d %11.6f" % (step, self.steps[step], self.seconds[step])]
+        for name in sorted(self.scans):
+            lines += ["%s: %d scans" % (name, self.scans[name])]
+        for name in sorted(self.lookups):
+            lines += ["%s: %d lookups" % (name, self.lookups[name])]
+        lines += ["augmentations: %d, average path length %.1f" %
+                  (self.augmentations, self.path_length / self.augmentations if self.augmentations else 0.0)]
+        lines += ["total: %.6fs" % self.total_seconds()]
+        return '\n'.join(lines)
+
+    def save(self, filepath):
+        with open(filepath, 'w') as out:
+            json.dump(self.as_dict(), out, indent=2)
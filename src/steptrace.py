@@ -0,0 +1,132 @@
+import json
+
+
+class StepTrace:
+    # what every step of the Munkres step machine changed, as deltas:
+    #   rows / cols    (index, delta) added to a row / column of the reduced
+    #                  costs, every step 1 and step 6 update is such a shift
+    #   marks          (row, col, old, new) star (1) and prime (2) changes
+    #   row_covers /   indices whose cover flipped
+    #   col_covers
+    # together with the matrix the solve started from, this is enough to
+    # rebuild the state after any step in both directions
+
+    def __init__(self, matrix=None, steps=None):
+        self.__matrix = matrix
+        self.__steps = steps if steps is not None else []
+
+    def start(self, cost_matrix):
+        self.__matrix = [list(row) for row in cost_matrix]
+        self.__steps = []
+
+    def record(self, step, next_step, rows, cols, marks, row_covers, col_covers):
+        self.__steps += [{'step': step,
+                          'next': next_step,
+                          'rows': rows,
+                          'cols': cols,
+                          'marks': marks,
+                          'row_covers': row_covers,
+                          'col_covers': col_covers}]
+
+    @property
+    def matrix(self):
+        return self.__matrix
+
+    def __len__(self):
+        return len(self.__steps)
+
+    def __getitem__(self, index):
+        return self.__steps[index]
+
+    def save(self, filepath):
+        with open(filepath, 'w') as out:
+            json.dump({'matrix': self.__matrix, 'steps': self.__steps}, out)
+
+    @classmethod
+    def load(cls, filepath):
+        with open(filepath) as tracefile:
+            data = json.load(tracefile)
+
+        steps = []
+        for delta in data['steps']:
+            delta['rows'] = [tuple(item) for item in delta['rows']]
+            delta['cols'] = [tuple(item) for item in delta['cols']]
+            delta['marks'] = [tuple(item) for item in delta['marks']]
+            steps += [delta]
+        return cls(data['matrix'], steps)
+
+
+class TracePlayer:
+    # replays a StepTrace: forward() and backward() apply one step's delta,
+    # reduced costs are only computed for the cells that are asked for
+
+    def __init__(self, trace):
+        n = len(trace.matrix)
+        self.__trace = trace
+        self.__position = 0
+        self.__row_offset = [0] * n
+        self.__col_offset = [0] * n
+        self.__marks = {}
+        self.__row_covered = [False] * n
+        self.__col_covered = [False] * n
+
+    @property
+    def position(self):
+        return self.__position
+
+    def at_end(self):
+        return self.__position >= len(self.__trace)
+
+    def is_finished(self):
+        return self.__position > 0 and self.__trace[self.__position - 1]['next'] == 7
+
+    def value(self, row, col):
+        return self.__trace.matrix[row][col] + self.__row_offset[row] + self.__col_offset[col]
+
+    def get_marked(self):
+        return sorted(cell for cell, mark in self.__marks.items() if mark == 1)
+
+    def get_row_covered(self):
+        return self.__row_covered
+
+    def get_col_covered(self):
+        return self.__col_covered
+
+    def forward(self):
+        if self.at_end():
+            return False
+        self.__apply(self.__trace[self.__position], 1)
+        self.__position += 1
+        return True
+
+    def backward(self):
+        if self.__position == 0:
+            return False
+        self.__position -= 1
+        self.__apply(self.__trace[self.__position], -1)
+        return True
+
+    def seek(self, position):
+        position = max(0, min(position, len(self.__trace)))
+        while self.__position < position:
+            self.forward()
+        while self.__position > position:
+            self.backward()
+
+    def __apply(self, delta, direction):
+        for i, shift in delta['rows']:
+            self.__row_offset[i] += direction * shift
+        for j, shift in delta['cols']:
+            self.__col_offset[j] += direction * shift
+
+        for i, j, old, new in delta['marks']:
+            mark = new if direction > 0 else old
+            if mark:
+                self.__marks[(i, j)] = mark
+            else:
+                self.__marks.pop((i, j), None)
+
+        for i in delta['row_covers']:
+            self.__row_covered[i] = not self.__row_covered[i]
+        for j in delta['col_covers']:
+            self.__col_covered[j] = not self.__col_covered[j]
@@ -0,0 +1,235 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from costs import FLOAT64, INT64, cost_kind, has_forbidden
+from munkres_numpy import np
+from sparse import check_feasible
+
+# float64 holds every integer up to here exactly
+EXACT_LIMIT = 2 ** 53
+
+# narrower column blocks cost more in thread handoffs than they save, a
+# search step handles a few microseconds of work per thousand columns
+MIN_BLOCK = 2048
+
+
+class ThreadedLapJV:
+    # LapJV on a float64 ndarray for large dense problems, with the columns
+    # split into one block per worker. Every step of the shortest path search
+    # (reduced costs of the scanned row, shortest distance updates, the
+    # block's lowest distance) and the column reduction run block by block on
+    # a thread pool; NumPy releases the GIL inside those kernels. The block
+    # results are combined in a fixed order (lowest distance, then a free
+    # column, then the lowest index) so the assignment does not depend on
+    # the number of workers
+
+    def __init__(self, workers=None):
+        if np is None:
+            raise ImportError("ThreadedLapJV requires numpy")
+
+        self.__workers = workers or os.cpu_count() or 1
+        self.__pool = None
+        self.__C = None
+        self.__n = 0
+        self.__m = 0
+        self.__transposed = False
+        self.__forbidden = False
+        self.__u = None
+        self.__v = None
+        self.__col4row = None
+        self.__row4col = None
+        self.__shortest = None
+        self.__path = None
+        self.__remaining = None
+        self.__blocks = []
+        self.__progress = None
+        self.__cancelled = False
+
+    def set_progress(self, callback):
+        # same contract as LapJV.set_progress: callback(matched, n) after
+        # every augmentation, False stops solve_all with a partial matching
+        self.__progress = callback
+
+    def is_cancelled(self):
+        return self.__cancelled
+
+    def set_workers(self, workers):
+        self.close()
+        self.__workers = workers or os.cpu_count() or 1
+        if self.__C is not None:
+            self.__split()
+
+    def get_workers(self):
+        return self.__workers
+
+    def close(self):
+        if self.__pool is not None:
+            self.__pool.shutdown()
+            self.__pool = None
+
+    def setup(self, cost_matrix):
+        # works on a float64 copy, transposed when there are more rows than
+        # columns. Integer costs must stay below 2**53 to be exact
+        kind = cost_kind(cost_matrix)
+        if kind not in (INT64, FLOAT64):
+            raise ValueError("ThreadedLapJV needs int64 or float64 costs, use the lapjv engine for %s" % kind)
+        C = np.array(cost_matrix, dtype=np.float64)
+        if kind == INT64 and C.size and np.abs(C).max() >= EXACT_LIMIT:
+            raise ValueError("integer costs of 2**53 and more are not exact in float64, use the lapjv engine")
+
+        self.__transposed = C.shape[0] > C.shape[1]
+        if self.__transposed:
+            C = np.ascontiguousarray(C.T)
+        self.__C = C
+        self.__n, self.__m = C.shape
+        self.__forbidden = has_forbidden(C)
+
+        self.__u = np.zeros(self.__n)
+        self.__v = np.zeros(self.__m)
+        self.__col4row = np.full(self.__n, -1, dtype=np.intp)
+        self.__row4col = np.full(self.__m, -1, dtype=np.intp)
+        self.__shortest = np.full(self.__m, math.inf)
+        self.__path = np.full(self.__m, -1, dtype=np.intp)
+        self.__remaining = np.ones(self.__m, dtype=bool)
+        self.__split()
+
+    def __split(self):
+        # contiguous column blocks of at least MIN_BLOCK columns
+        count = max(1, min(self.__workers, self.__m // MIN_BLOCK))
+        bounds = [self.__m * k // count for k in range(count + 1)]
+        self.__blocks = [(bounds[k], bounds[k + 1]) for k in range(count)]
+        if count > 1 and self.__pool is None:
+            self.__pool = ThreadPoolExecutor(max_workers=count - 1)
+
+    def __map(self, function, *args):
+        # the calling thread takes the first block instead of waiting idle
+        first, rest = self.__blocks[0], self.__blocks[1:]
+        futures = [self.__pool.submit(function, block, *args) for block in rest]
+        return [function(first, *args)] + [future.result() for future in futures]
+
+    def get_marked(self):
+        if self.__transposed:
+            return sorted((j, i) for i, j in enumerate(self.__col4row.tolist()) if j >= 0)
+        return [(i, j) for i, j in enumerate(self.__col4row.tolist()) if j >= 0]
+
+    def get_assignment(self):
+        # column of every row of the caller's matrix, -1 when it is not assigned
+        if self.__transposed:
+            return self.__row4col.tolist()
+        return self.__col4row.tolist()
+
+    def get_potentials(self):
+        return self.__u, self.__v
+
+    def solve_all(self):
+        if self.__forbidden:
+            check_feasible(self.__C)
+
+        self.__u[:] = 0
+        self.__v[:] = 0
+        self.__col4row[:] = -1
+        self.__row4col[:] = -1
+        self.__cancelled = False
+        # as in LapJV, a rectangular problem keeps v = 0 on its free columns
+        if self.__n == self.__m:
+            self.__column_reduction()
+        progress = self.__progress
+        matched = int((self.__col4row >= 0).sum())
+        for i in range(self.__n):
+            if self.__col4row[i] < 0:
+                self.__augment(i)
+                matched += 1
+                if progress is not None and progress(matched, self.__n) is False:
+                    self.__cancelled = True
+                    return
+
+    def __column_minimum(self, block):
+        a, b = block
+        C = self.__C[:, a:b]
+        rows = C.argmin(axis=0)
+        self.__v[a:b] = C[rows, np.arange(b - a)]
+        return rows
+
+    def __column_reduction(self):
+        # v[j] is the column minimum, a free row that owns one is matched
+        rows = np.concatenate(self.__map(self.__column_minimum)).tolist()
+        col4row, row4col = self.__col4row, self.__row4col
+        for j in range(self.__m - 1, -1, -1):
+            i = rows[j]
+            if col4row[i] < 0:
+                col4row[i] = j
+                row4col[j] = i
+
+    def __scan(self, block, i, offset):
+        # relaxes the columns of one block from row i, returns the lowest
+        # distance of the block's remaining columns, its column and whether
+        # that column is free
+        a, b = block
+        shortest = self.__shortest[a:b]
+        remaining = self.__remaining[a:b]
+        distance = self.__C[i, a:b] - self.__v[a:b]
+        distance += offset
+        better = distance < shortest
+        better &= remaining
+        np.copyto(shortest, distance, where=better)
+        np.copyto(self.__path[a:b], i, where=better)
+
+        candidates = np.where(remaining, shortest, math.inf)
+        k = int(candidates.argmin())
+        lowest = candidates[k]
+        if lowest == math.inf:
+            return lowest, -1, False
+        free = self.__row4col[a:b]
+        if free[k] >= 0:
+            ties = np.flatnonzero(candidates == lowest)
+            ties = ties[free[ties] < 0]
+            if ties.size:
+                k = int(ties[0])
+        return lowest, a + k, bool(free[k] < 0)
+
+    def __augment(self, cur_row):
+        # LapJV.__augment with the column loop done by __scan per block
+        C, u, v = self.__C, self.__u, self.__v
+        col4row, row4col = self.__col4row, self.__row4col
+        shortest, path, remaining = self.__shortest, self.__path, self.__remaining
+
+        u[cur_row] = (C[cur_row] - v).min()
+
+        scanned_rows = []
+        scanned_cols = []
+        min_val = 0.0
+        sink = -1
+        i = cur_row
+        while sink < 0:
+            scanned_rows.append(i)
+            results = self.__map(self.__scan, i, min_val - u[i])
+            lowest, j, free = min(results, key=lambda result: (result[0], not result[2], result[1]))
+            if j < 0:
+                raise ValueError("row %d cannot be assigned" % cur_row)
+
+            min_val = lowest
+            remaining[j] = False
+            scanned_cols.append(j)
+            if free:
+                sink = j
+            else:
+                i = int(row4col[j])
+
+        u[cur_row] += min_val
+        rows = np.array(scanned_rows[1:], dtype=np.intp)
+        cols = np.array(scanned_cols, dtype=np.intp)
+        u[rows] += min_val - shortest[col4row[rows]]
+        v[cols] -= min_val - shortest[cols]
+
+        j = sink
+        while True:
+            i = int(path[j])
+            row4col[j] = i
+            col4row[i], j = j, int(col4row[i])
+            if i == cur_row:
+                break
+
+        shortest.fill(math.inf)
+        path.fill(-1)
+        remaining.fill(True)
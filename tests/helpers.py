@@ -0,0 +1,13 @@
+import itertools
+
+
+def brute_force(matrix):
+    # cheapest total over every assignment of the smaller side, for tiny matrices
+    n, m = len(matrix), len(matrix[0])
+    if n <= m:
+        return min(sum(matrix[i][j] for i, j in enumerate(cols)) for cols in itertools.permutations(range(m), n))
+    return min(sum(matrix[i][j] for j, i in enumerate(rows)) for rows in itertools.permutations(range(n), m))
+
+
+def total(matrix, marked):
+    return sum(matrix[i][j] for i, j in marked)
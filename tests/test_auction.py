@@ -0,0 +1,59 @@
+import random
+import time
+from decimal import Decimal
+
+import pytest
+
+from auction import Auction
+from helpers import brute_force
+from munkres_numpy import np
+from solver import solve_within
+
+
+@pytest.mark.parametrize('matrix', [
+    [[Decimal(1), Decimal(2)], [Decimal(3), Decimal(1)]],
+    [[10 ** 30, 1], [2, 10 ** 30]],
+    [[10 ** 18, 10 ** 18 + 7], [10 ** 18 + 3, 10 ** 18 + 80]],
+    [[2 ** 53, 0], [0, 2 ** 53]],
+])
+def test_costs_beyond_float64_are_rejected(matrix):
+    # float64 prices used to loop forever on these, raise a TypeError or
+    # return a wrong assignment
+    with pytest.raises(ValueError):
+        Auction().setup(matrix)
+
+
+@pytest.mark.skipif(np is None, reason="needs numpy")
+def test_int64_costs_near_1e18_are_rejected():
+    matrix = np.array([[10 ** 18, 10 ** 18 + 7], [10 ** 18 + 3, 10 ** 18 + 80]], dtype=np.int64)
+    with pytest.raises(ValueError):
+        solve_within(matrix)
+
+
+def test_integer_costs_are_exact():
+    rng = random.Random(23)
+    for _ in range(100):
+        rows, cols = rng.randint(1, 6), rng.randint(1, 6)
+        matrix = [[rng.randint(-50, 50) for _ in range(cols)] for _ in range(rows)]
+        _, total_cost, lower_bound = solve_within(matrix)
+        assert total_cost == lower_bound == brute_force(matrix)
+
+
+def test_float_costs_with_a_big_m_cell():
+    rng = random.Random(24)
+    for _ in range(50):
+        matrix = [[rng.random() * 10 ** rng.randint(-3, 6) for _ in range(6)] for _ in range(6)]
+        matrix[rng.randrange(6)][rng.randrange(6)] = 1e12
+        _, total_cost, lower_bound = solve_within(matrix)
+        assert total_cost == pytest.approx(brute_force(matrix), rel=1e-9)
+        assert lower_bound <= total_cost
+
+
+def test_budget_includes_setup_and_the_finishing_passes():
+    rng = random.Random(25)
+    matrix = [[rng.randint(0, 10 ** 6) for _ in range(200)] for _ in range(200)]
+    budget = 0.05
+    start = time.perf_counter()
+    _, total_cost, lower_bound = solve_within(matrix, budget)
+    assert time.perf_counter() - start < 3 * budget
+    assert lower_bound <= total_cost
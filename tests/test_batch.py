@@ -0,0 +1,39 @@
+import random
+
+import pytest
+
+from batch import solve_batch
+from helpers import brute_force
+from munkres_numpy import np
+from solver import solve
+
+
+def test_tall_matrices():
+    # the unassigned row of a tall matrix used to add its last column
+    matrices = [[[1, 80], [9, 7], [15, 21]], [[90, 2], [20, 50], [1, 90]]]
+    assignments, costs = solve_batch(matrices)
+    assert costs == [brute_force(matrix) for matrix in matrices] == [8, 3]
+    for matrix, cols in zip(matrices, assignments):
+        assert sorted(j for j in cols if j >= 0) == [0, 1]
+        assert list(cols).count(-1) == 1
+
+
+def test_lists_match_single_solves():
+    rng = random.Random(3)
+    shapes = [(rng.randint(1, 6), rng.randint(1, 6)) for _ in range(30)]
+    matrices = [[[rng.randint(0, 99) for _ in range(m)] for _ in range(n)] for n, m in shapes]
+    assignments, costs = solve_batch(matrices)
+    for matrix, cols, total_cost in zip(matrices, assignments, costs):
+        assert total_cost == solve(matrix)[1] == brute_force(matrix)
+        assert total_cost == sum(matrix[i][j] for i, j in enumerate(cols) if j >= 0)
+
+
+@pytest.mark.skipif(np is None, reason="needs numpy")
+@pytest.mark.parametrize('shape', [(20, 6, 6), (10, 5, 3), (10, 3, 5)])
+def test_stacked_matches_single_solves(shape):
+    matrices = np.random.default_rng(3).integers(0, 100, shape)
+    assignments, costs = solve_batch(matrices)
+    assert assignments.shape == shape[:2]
+    for matrix, cols, total_cost in zip(matrices, assignments, costs):
+        assert total_cost == solve(matrix)[1]
+        assert total_cost == sum(matrix[i, j] for i, j in enumerate(cols) if j >= 0)
@@ -0,0 +1,53 @@
+import os
+from decimal import Decimal
+
+from cache import SolutionCache, fingerprint
+
+
+def test_memory_round_trip():
+    cache = SolutionCache(max_entries=2)
+    matrix = [[4, 1], [2, 8]]
+    assert cache.solve(matrix) == ([(0, 1), (1, 0)], 3)
+    assert cache.solve(matrix) == ([(0, 1), (1, 0)], 3)
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+    for k in range(3):
+        cache.put(str(k), [(0, 0)], k)
+    assert len(cache) == 2
+    assert cache.get('0') is None and cache.get('2') == ([(0, 0)], 2)
+
+
+def test_fingerprint():
+    assert fingerprint([[1, 2], [3, 4]], 'lapjv') == fingerprint([[1, 2], [3, 4]], 'lapjv')
+    assert fingerprint([[1, 2], [3, 4]], 'lapjv') != fingerprint([[1, 2], [3, 5]], 'lapjv')
+    assert fingerprint([[1, 2], [3, 4]], 'lapjv') != fingerprint([[1, 2], [3, 4]], 'munkres')
+
+
+def test_disk_round_trip(tmp_path):
+    matrix = [[4, 1], [2, 8]]
+    SolutionCache(directory=str(tmp_path)).solve(matrix)
+    cache = SolutionCache(directory=str(tmp_path))
+    assert cache.solve(matrix) == ([(0, 1), (1, 0)], 3)
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_failed_write_leaves_no_temp_file(tmp_path):
+    cache = SolutionCache(directory=str(tmp_path))
+    cache.put('key', [(0, 0)], Decimal('1.5'))
+    assert cache.get('key') == ([(0, 0)], Decimal('1.5'))
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_disk_is_bounded(tmp_path):
+    cache = SolutionCache(directory=str(tmp_path), max_files=8)
+    for k in range(8):
+        cache.put('%02d' % k, [(0, 0)], k)
+        os.utime(str(tmp_path / ('%02d.json' % k)), (k, k))
+    cache.put('08', [(0, 0)], 8)
+    stored = sorted(os.listdir(str(tmp_path)))
+    assert len(stored) == 6
+    assert '08.json' in stored and '00.json' not in stored
+
+    # the limit holds for a directory filled by an earlier run too
+    SolutionCache(directory=str(tmp_path), max_files=4)
+    assert len(os.listdir(str(tmp_path))) == 3
@@ -0,0 +1,52 @@
+import math
+
+import pytest
+
+from batch import solve_batch
+from costs import FORBIDDEN, cost_kind, parse_cost
+from engines import ENGINES
+from munkres_numpy import np
+from solver import solve
+
+NOT_COSTS = [math.nan, -math.inf]
+
+
+@pytest.mark.parametrize('text', ['nan', 'NaN', '-inf', '-infinity', ' -Infinity '])
+def test_parse_cost_rejects_nan_and_minus_inf(text):
+    with pytest.raises(ValueError):
+        parse_cost(text)
+
+
+@pytest.mark.parametrize('text, value', [('x', FORBIDDEN), ('inf', FORBIDDEN), ('+inf', FORBIDDEN),
+                                         ('12', 12), ('-3', -3), ('2.5', 2.5), ('1e3', 1000.0)])
+def test_parse_cost(text, value):
+    assert parse_cost(text) == value
+
+
+@pytest.mark.parametrize('value', NOT_COSTS)
+def test_cost_kind_rejects_nan_and_minus_inf(value):
+    with pytest.raises(ValueError):
+        cost_kind([[1, 2], [3, value]])
+    with pytest.raises(ValueError):
+        cost_kind([[1.5, value]])
+    if np is not None:
+        with pytest.raises(ValueError):
+            cost_kind(np.array([[1.0, value]]))
+        with pytest.raises(ValueError):
+            cost_kind(np.array([[1, value]], dtype=object))
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+@pytest.mark.parametrize('value', NOT_COSTS)
+def test_engines_fail_fast(engine, value):
+    # a NaN cell used to make the LapJV augmentation loop forever
+    if engine == 'threaded' and np is None:
+        pytest.skip("needs numpy")
+    with pytest.raises(ValueError):
+        solve([[value, 2], [3, 4]], engine)
+
+
+@pytest.mark.parametrize('value', NOT_COSTS)
+def test_batch_fails_fast(value):
+    with pytest.raises(ValueError):
+        solve_batch([[[value, 2], [3, 4]]])
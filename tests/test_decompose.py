@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+from costs import FORBIDDEN
+from decompose import components, forced_pairs, solve_decomposed
+from helpers import brute_force
+from munkres_numpy import np
+from solver import solve
+from sparse import InfeasibleError
+
+
+def _blocks(rng, sizes):
+    # a block diagonal matrix of the given (rows, cols) blocks with its rows
+    # and columns shuffled, every pair outside the blocks is forbidden
+    n = sum(rows for rows, _ in sizes)
+    m = sum(cols for _, cols in sizes)
+    matrix = [[FORBIDDEN] * m for _ in range(n)]
+    top = left = 0
+    for rows, cols in sizes:
+        for i in range(top, top + rows):
+            for j in range(left, left + cols):
+                matrix[i][j] = rng.randint(0, 50)
+        top += rows
+        left += cols
+    rng.shuffle(matrix)
+    order = list(range(m))
+    rng.shuffle(order)
+    return [[row[j] for j in order] for row in matrix]
+
+
+def _check(matrix, marked, total_cost):
+    assert len(marked) == min(len(matrix), len(matrix[0]))
+    assert len({i for i, _ in marked}) == len({j for _, j in marked}) == len(marked)
+    assert total_cost == sum(matrix[i][j] for i, j in marked) == solve(matrix)[1]
+
+
+def test_components_of_a_block_matrix():
+    matrix = [[1, FORBIDDEN, 2, FORBIDDEN],
+              [FORBIDDEN, 3, FORBIDDEN, FORBIDDEN],
+              [4, FORBIDDEN, FORBIDDEN, FORBIDDEN]]
+    assert components(matrix) == [([0, 2], [0, 2]), ([1], [1])]
+    # with a limit the cheap pairs alone decide the components
+    assert components([[1, 9], [9, 1]], limit=5) == [([0], [0]), ([1], [1])]
+    if np is not None:
+        assert components(np.array(matrix, dtype=float)) == components(matrix)
+
+
+def test_forced_pairs_follow_single_choices():
+    costs = [[1, FORBIDDEN, FORBIDDEN],
+             [2, 3, FORBIDDEN],
+             [4, 5, 6]]
+    assert forced_pairs(costs, square=True) == [(0, 0), (1, 1), (2, 2)]
+    assert forced_pairs([[1, 2], [3, 4]], square=True) == []
+    with pytest.raises(InfeasibleError):
+        forced_pairs([[1, FORBIDDEN], [2, FORBIDDEN]], square=True)
+
+
+@pytest.mark.parametrize('sizes', [[(3, 3), (2, 2), (1, 1), (4, 4)],
+                                   [(2, 3), (3, 4), (1, 2)],
+                                   [(3, 2), (4, 3), (2, 1)]])
+def test_matches_a_whole_solve(sizes):
+    rng = random.Random(24)
+    for _ in range(10):
+        matrix = _blocks(rng, sizes)
+        marked, total_cost = solve_decomposed(matrix, workers=0)
+        _check(matrix, marked, total_cost)
+
+
+def test_big_components_in_a_pool():
+    rng = random.Random(25)
+    matrix = _blocks(rng, [(6, 6), (5, 5), (4, 4)])
+    assert solve_decomposed(matrix, workers=2, parallel_size=4) == solve_decomposed(matrix, workers=0)
+    _check(matrix, *solve_decomposed(matrix, workers=2, parallel_size=4))
+
+
+def test_limit_forbids_expensive_pairs():
+    rng = random.Random(26)
+    for _ in range(20):
+        matrix = [[rng.randint(0, 99) for _ in range(5)] for _ in range(5)]
+        limited = [[cost if cost < 60 else FORBIDDEN for cost in row] for row in matrix]
+        try:
+            marked, total_cost = solve_decomposed(matrix, workers=0, limit=60)
+        except InfeasibleError:
+            assert brute_force(limited) == FORBIDDEN
+            continue
+        assert all(matrix[i][j] < 60 for i, j in marked)
+        assert total_cost == brute_force(limited)
+
+
+def test_infeasible_groups_name_their_side():
+    with pytest.raises(InfeasibleError) as info:
+        solve_decomposed([[1, FORBIDDEN, FORBIDDEN], [2, FORBIDDEN, FORBIDDEN], [3, 4, 5]], workers=0)
+    assert 'row 1' in str(info.value)
+    # a tall matrix is solved transposed, its columns are the side that must fit
+    with pytest.raises(InfeasibleError) as info:
+        solve_decomposed([[1, FORBIDDEN], [2, FORBIDDEN], [3, FORBIDDEN]], workers=0)
+    assert 'column 1' in str(info.value)
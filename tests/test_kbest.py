@@ -0,0 +1,44 @@
+import itertools
+import random
+
+import kbest
+from costs import FORBIDDEN
+
+
+def _all_costs(matrix):
+    n, m = len(matrix), len(matrix[0])
+    if n > m:
+        matrix = [list(col) for col in zip(*matrix)]
+        n, m = m, n
+    costs = [sum(matrix[i][j] for i, j in enumerate(cols)) for cols in itertools.permutations(range(m), n)]
+    return sorted(cost for cost in costs if cost != FORBIDDEN)
+
+
+def test_every_assignment_in_order():
+    rng = random.Random(22)
+    for _ in range(30):
+        rows, cols = rng.randint(1, 5), rng.randint(1, 5)
+        matrix = [[rng.choice([rng.randint(0, 9), FORBIDDEN]) for _ in range(cols)] for _ in range(rows)]
+        results = list(kbest.kbest(matrix))
+        assert [cost for _, cost in results] == _all_costs(matrix)
+        assert len({tuple(marked) for marked, _ in results}) == len(results)
+
+
+def test_only_yielded_children_are_solved(monkeypatch):
+    # children whose search proves they cost more than the next queue entry
+    # go back at that bound instead of being solved to the end
+    solved = []
+    solve = kbest._Murty.solve
+
+    def counting(self, parent, t, limit=float('inf')):
+        child = solve(self, parent, t, limit)
+        if isinstance(child, kbest._Node):
+            solved.append(child)
+        return child
+
+    monkeypatch.setattr(kbest._Murty, 'solve', counting)
+    rng = random.Random(0)
+    matrix = [[rng.randint(0, 1000) for _ in range(60)] for _ in range(60)]
+    results = list(itertools.islice(kbest.kbest(matrix), 50))
+    assert len(results) == 50
+    assert len(solved) < 2 * len(results)
@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from costs import FORBIDDEN
+from helpers import brute_force, total
+from lapjv import LapJV
+from sparse import InfeasibleError, check_feasible
+
+
+def _cold(matrix):
+    solver = LapJV()
+    solver.setup([row[:] for row in matrix])
+    solver.solve_all()
+    return total(matrix, solver.get_marked())
+
+
+def _check(solver, matrix):
+    marked = solver.get_marked()
+    assert len(marked) == min(len(matrix), len(matrix[0]))
+    assert len({j for _, j in marked}) == len(marked)
+    assert all(matrix[i][j] != FORBIDDEN for i, j in marked)
+    assert total(matrix, marked) == _cold(matrix) == brute_force(matrix)
+
+
+def _feasible(matrix):
+    try:
+        check_feasible(matrix)
+    except InfeasibleError:
+        return False
+    return True
+
+
+@pytest.mark.parametrize('shape', [(6, 6), (4, 6), (6, 4)])
+def test_resolve_matches_a_cold_solve(shape):
+    # the GUI's default path after the first solve: edit, then resolve()
+    rng = random.Random(6)
+    rows, cols = shape
+    for _ in range(20):
+        matrix = [[rng.randint(0, 50) for _ in range(cols)] for _ in range(rows)]
+        solver = LapJV()
+        solver.setup(matrix)
+        solver.solve_all()
+
+        for _ in range(10):
+            edit = rng.choice(['cell', 'row', 'col'])
+            if edit == 'cell':
+                solver.set_cell(rng.randrange(rows), rng.randrange(cols), rng.randint(-10, 60))
+            elif edit == 'row':
+                solver.set_row(rng.randrange(rows), [rng.randint(0, 50) for _ in range(cols)])
+            else:
+                solver.set_col(rng.randrange(cols), [rng.randint(0, 50) for _ in range(rows)])
+            solver.resolve()
+            _check(solver, matrix)
+
+
+def test_resolve_with_forbidden_cells():
+    rng = random.Random(7)
+    for _ in range(30):
+        matrix = [[rng.randint(0, 50) for _ in range(5)] for _ in range(5)]
+        solver = LapJV()
+        solver.setup(matrix)
+        solver.solve_all()
+
+        for _ in range(8):
+            i, j = rng.randrange(5), rng.randrange(5)
+            old = matrix[i][j]
+            solver.set_cell(i, j, FORBIDDEN)
+            if not _feasible(matrix):
+                with pytest.raises(InfeasibleError):
+                    solver.resolve()
+                solver.set_cell(i, j, old)
+            solver.resolve()
+            _check(solver, matrix)
+
+
+def test_edits_reach_the_callers_matrix():
+    matrix = [[4, 1, 3], [2, 0, 5], [3, 2, 2]]
+    solver = LapJV()
+    solver.setup(matrix)
+    solver.solve_all()
+    solver.set_cell(0, 1, 9)
+    solver.set_row(2, [1, 1, 1])
+    solver.set_col(0, [7, 7, 7])
+    assert matrix == [[7, 9, 3], [7, 0, 5], [7, 1, 1]]
+    solver.resolve()
+    _check(solver, matrix)
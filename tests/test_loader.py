@@ -0,0 +1,33 @@
+import math
+
+from costs import FORBIDDEN
+from loader import integral, load_matrix, save_matrix, whole_lists
+from solver import solve
+
+
+def test_forbidden_cells_round_trip(tmp_path):
+    # an integer file with x cells used to come back with 12.0 totals and be
+    # saved with inf cells
+    path = tmp_path / 'matrix.csv'
+    path.write_text('4,x,3\n2,5,x\nx,1,9\n')
+    matrix = load_matrix(str(path))
+    assert integral(matrix)
+    assert whole_lists(matrix) == [[4, FORBIDDEN, 3], [2, 5, FORBIDDEN], [FORBIDDEN, 1, 9]]
+
+    saved = tmp_path / 'saved.csv'
+    save_matrix(str(saved), matrix)
+    assert saved.read_text().split() == ['4,x,3', '2,5,x', 'x,1,9']
+    save_matrix(str(saved), whole_lists(matrix))
+    assert saved.read_text().split() == ['4,x,3', '2,5,x', 'x,1,9']
+
+
+def test_float_costs_stay_floats(tmp_path):
+    rows = [[1.5, FORBIDDEN], [2.0, 0.25]]
+    assert not integral(rows)
+    assert not integral([[1.0, 2.0], [3.0, 4.0]])
+    path = tmp_path / 'matrix.csv'
+    save_matrix(str(path), rows)
+    assert path.read_text().split() == ['1.5,x', '2.0,0.25']
+    loaded = whole_lists(load_matrix(str(path)))
+    assert loaded[0][1] == math.inf
+    assert solve(loaded)[1] == 1.75
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from helpers import brute_force, total
+from munkres import Munkres
+from munkres_numpy import NumpyMunkres, np
+from stats import SolveStats
+
+ENGINES = [Munkres] + ([NumpyMunkres] if np is not None else [])
+
+
+def _solve(engine, matrix):
+    solver = engine()
+    solver.setup(matrix)
+    solver.solve_all()
+    return total(matrix, solver.get_marked())
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_big_m_cell_does_not_widen_the_zero_test(engine):
+    # one "effectively forbidden" cell used to set a zero tolerance of 1000
+    # for the whole matrix, so reduced costs below it counted as zeros
+    rng = random.Random(18)
+    for _ in range(50):
+        matrix = [[round(rng.uniform(0, 300), 3) for _ in range(6)] for _ in range(6)]
+        matrix[rng.randrange(6)][rng.randrange(6)] = 1e12
+        assert _solve(engine, matrix) == pytest.approx(brute_force(matrix))
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_float_costs(engine):
+    rng = random.Random(3)
+    for _ in range(50):
+        n = rng.randint(1, 6)
+        matrix = [[rng.random() * 10 ** rng.randint(-3, 6) for _ in range(n)] for _ in range(n)]
+        assert _solve(engine, matrix) == pytest.approx(brute_force(matrix))
+
+
+def test_stats_tell_lookups_from_scans():
+    # __find_a_zero reads the zero index, it used to be counted as a scan
+    hook = SolveStats()
+    solver = Munkres()
+    solver.set_hook(hook)
+    matrix = [[(i * j) % 7 + i for j in range(6)] for i in range(6)]
+    solver.setup(matrix)
+    solver.solve_all()
+    assert total(matrix, solver.get_marked()) == brute_force(matrix)
+    assert set(hook.scans) <= {'find_smallest'}
+    assert hook.lookups['find_a_zero'] > 0
+    assert 'lookups' in hook.as_dict() and 'find_a_zero: ' in hook.summary()
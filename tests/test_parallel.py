@@ -0,0 +1,25 @@
+from decimal import Decimal
+
+import pytest
+
+from munkres_numpy import np
+from parallel import ParallelSolver
+
+pytestmark = pytest.mark.skipif(np is None, reason="needs numpy")
+
+
+@pytest.mark.parametrize('matrices', [
+    [[[10 ** 30, 1], [2, 10 ** 30]]],
+    [[[Decimal(1), Decimal(2)], [Decimal(3), Decimal(1)]]],
+])
+def test_object_costs_are_rejected(matrices):
+    # their pointers used to be copied into shared memory
+    with ParallelSolver(workers=1) as solver:
+        with pytest.raises(ValueError):
+            solver.solve(matrices)
+
+
+def test_numeric_costs():
+    with ParallelSolver(workers=1) as solver:
+        _, costs = solver.solve([[[4, 1], [2, 8]], [[1.5, 2.0], [0.5, 3.0]]])
+    assert costs == [3, 2.5]
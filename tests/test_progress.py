@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from engines import ENGINES, make_engine
+from munkres_numpy import np
+
+
+def _matrix(n=80):
+    rng = random.Random(25)
+    return [[rng.randint(0, 1000) for _ in range(n)] for _ in range(n)]
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_progress_is_reported(engine):
+    if engine in ('numpy', 'threaded') and np is None:
+        pytest.skip("needs numpy")
+    calls = []
+    solver = make_engine(engine)
+    solver.set_progress(lambda matched, n: calls.append((matched, n)))
+    solver.setup(_matrix())
+    solver.solve_all()
+    assert calls and all(0 <= matched <= n == 80 for matched, n in calls)
+    assert not solver.is_cancelled()
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_progress_can_cancel(engine):
+    # the auction and threaded engines had no progress callback, the GUI and
+    # CLI progress path raised AttributeError on them
+    if engine in ('numpy', 'threaded') and np is None:
+        pytest.skip("needs numpy")
+    calls = []
+
+    def stop(matched, n):
+        calls.append(matched)
+        return False
+
+    solver = make_engine(engine)
+    solver.set_progress(stop)
+    solver.setup(_matrix())
+    solver.solve_all()
+    assert len(calls) == 1
+    assert solver.is_cancelled()
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import socket
+
+import pytest
+
+from service import LoopbackClient, SolveService
+
+
+def _run(requests, **options):
+    async def run():
+        async with SolveService(workers=0, **options) as service:
+            client = LoopbackClient(service)
+            return await asyncio.gather(*(client.request(request) for request in requests))
+    return asyncio.run(run())
+
+
+def test_loopback_round_trip():
+    responses = _run([{'id': 1, 'matrix': [[4, 1], [2, 'x']]},
+                      {'id': 2, 'matrix': [[4, 1], [2, 8]], 'engine': 'munkres', 'timeout': 5},
+                      {'id': 3, 'matrix': [[1, 'x'], [2, 'x']]}])
+    assert responses[0] == {'id': 1, 'assignment': [[0, 1], [1, 0]], 'total_cost': 3}
+    assert responses[1] == {'id': 2, 'assignment': [[0, 1], [1, 0]], 'total_cost': 3}
+    assert responses[2]['kind'] == 'infeasible'
+
+
+@pytest.mark.parametrize('request_', [
+    {'matrix': [["nan", 2], [3, 4]]},
+    {'matrix': [[float('nan'), 2], [3, 4]]},
+    {'matrix': [[float('-inf'), 2], [3, 4]]},
+    {'matrix': [["-inf", 2], [3, 4]]},
+    {'matrix': [[None, 2], [3, 4]]},
+    {'matrix': [[True, 2], [3, 4]]},
+    {'matrix': [[[1], 2], [3, 4]]},
+    {'matrix': [[1, 2], [3]]},
+    {'matrix': [[1, 2], [3, 4]], 'timeout': "soon"},
+    {'matrix': [[1, 2], [3, 4]], 'timeout': -1},
+    {'matrix': [[1, 2], [3, 4]], 'engine': ["lapjv"]},
+    {'matrix': [[1, 2], [3, 4]], 'engine': "simplex"},
+])
+def test_invalid_requests(request_):
+    # a NaN cell used to hang the batcher, the other cells failed with a
+    # server side traceback
+    invalid, valid = _run([request_, {'id': 2, 'matrix': [[1, 2], [3, 4]]}], timeout=5)
+    assert invalid['kind'] == 'invalid'
+    assert valid['total_cost'] == 5
+
+
+def test_listen_keeps_files_that_are_not_sockets(tmp_path):
+    path = str(tmp_path / 'file')
+    with open(path, 'w') as f:
+        f.write('data')
+
+    async def listen():
+        async with SolveService(workers=0) as service:
+            await service.listen(path)
+    with pytest.raises(FileExistsError):
+        asyncio.run(listen())
+    with open(path) as f:
+        assert f.read() == 'data'
+
+
+def test_listen_replaces_a_stale_socket(tmp_path):
+    path = str(tmp_path / 'sock')
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(path)
+    stale.close()
+
+    async def listen():
+        async with SolveService(workers=0) as service:
+            server = await service.listen(path)
+            server.close()
+            await server.wait_closed()
+    asyncio.run(listen())
@@ -0,0 +1,94 @@
+import math
+import random
+
+import pytest
+
+from costs import FORBIDDEN
+from helpers import brute_force, total
+from sparse import InfeasibleError, SparseCostMatrix, SparseLapJV, check_feasible
+
+
+def _feasible(matrix):
+    try:
+        check_feasible(matrix)
+    except InfeasibleError:
+        return False
+    return True
+
+
+def test_from_edges_keeps_the_cheapest_repeat():
+    sparse = SparseCostMatrix.from_edges([(0, 2, 5), (1, 0, 3), (0, 2, 4), (0, 1, 7)])
+    assert sparse.shape == (2, 3)
+    assert sparse.nnz == 3
+    assert sparse.get(0, 2) == 4
+    assert sparse.get(0, 0) is None
+    assert sparse.get(1, 1, FORBIDDEN) == FORBIDDEN
+    indices, data = sparse.row(0)
+    assert list(indices) == [1, 2] and list(data) == [7, 4]
+
+
+def test_from_dense_leaves_out_forbidden_and_empty_cells():
+    matrix = [[1, FORBIDDEN, 3], [None, 5, 6]]
+    sparse = SparseCostMatrix.from_dense(matrix)
+    indptr, indices, data = sparse.csr()
+    assert list(indptr) == [0, 2, 4]
+    assert list(indices) == [0, 2, 1, 2]
+    assert list(data) == [1, 3, 5, 6]
+
+
+@pytest.mark.parametrize('edges', [[(0, 3, 1)], [(2, 0, 1)]])
+def test_out_of_range_edges_are_rejected(edges):
+    with pytest.raises(ValueError):
+        SparseCostMatrix.from_edges(edges, 2, 2)
+
+
+@pytest.mark.parametrize('cost', [math.nan, -math.inf])
+def test_nan_and_minus_inf_are_rejected(cost):
+    with pytest.raises(ValueError):
+        SparseCostMatrix.from_edges([(0, 0, 1.0), (0, 1, cost)])
+
+
+@pytest.mark.parametrize('shape', [(5, 5), (4, 6)])
+def test_matches_brute_force(shape):
+    rng = random.Random(5)
+    rows, cols = shape
+    solved = 0
+    while solved < 40:
+        matrix = [[FORBIDDEN if rng.random() < 0.4 else rng.randint(0, 50) for _ in range(cols)]
+                  for _ in range(rows)]
+        if not _feasible(matrix):
+            continue
+        solver = SparseLapJV()
+        solver.setup(SparseCostMatrix.from_dense(matrix))
+        solver.solve_all()
+        marked = solver.get_marked()
+        assert len(marked) == rows
+        assert len({j for _, j in marked}) == rows
+        assert solver.get_total_cost() == total(matrix, marked) == brute_force(matrix)
+        solved += 1
+
+
+def test_infeasible_matrices_raise():
+    matrix = [[1, FORBIDDEN, FORBIDDEN], [2, FORBIDDEN, FORBIDDEN], [3, 4, 5]]
+    with pytest.raises(InfeasibleError):
+        check_feasible(matrix)
+    solver = SparseLapJV()
+    solver.setup(SparseCostMatrix.from_dense(matrix))
+    with pytest.raises(InfeasibleError):
+        solver.solve_all()
+
+
+def test_tall_matrices_raise():
+    with pytest.raises(InfeasibleError):
+        SparseLapJV().setup(SparseCostMatrix.from_dense([[1, 2], [3, 4], [5, 6]]))
+
+
+def test_check_feasible_names_the_side():
+    with pytest.raises(InfeasibleError) as info:
+        check_feasible([[FORBIDDEN, FORBIDDEN], [1, 2]])
+    assert 'row 0' in str(info.value)
+    # a tall matrix may leave rows out, but every column needs a row
+    check_feasible([[FORBIDDEN, FORBIDDEN], [1, 2], [3, 4]])
+    with pytest.raises(InfeasibleError) as info:
+        check_feasible([[1, FORBIDDEN], [2, FORBIDDEN], [3, FORBIDDEN]])
+    assert 'column 1' in str(info.value)